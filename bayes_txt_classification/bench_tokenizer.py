@@ -0,0 +1,50 @@
+"""
+Author: Kaikai Du
+Micro-benchmark of the bio tokenizers: strip_stopwords (regex per token) against Tokenizer
+(one precompiled regex per line plus a token cache)
+Usage: python3 bench_tokenizer.py <input_filepath> [--repeat 5]
+NOTE: requires stopwords.txt and numpy, like textClassifier.py
+"""
+
+import argparse
+import time
+
+from textClassifier import parse_stopwords, get_block, strip_stopwords, open_corpus, Tokenizer
+
+def read_blocks(filepath):
+    blocks = []
+    with open_corpus(filepath) as file:
+        block = get_block(file)
+        while block is not None:
+            blocks.append(block[2:])
+            block = get_block(file)
+    return blocks
+
+def best_time(fn,blocks,repeat):
+    #best of repeat passes over every bio, with the bio sets of the last pass
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bios = [fn(block) for block in blocks]
+        best = min(best,time.perf_counter()-start)
+    return best, bios
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Compare strip_stopwords with Tokenizer")
+    parser.add_argument('input_filepath')
+    parser.add_argument('--repeat',type = int,default = 5)
+    args = parser.parse_args()
+    stopwords = parse_stopwords()
+    blocks = read_blocks(args.input_filepath)
+    n_words = sum(len(line.split()) for block in blocks for line in block)
+    print(f"{len(blocks)} bios, {n_words} tokens")
+
+    old_time, old_bios = best_time(lambda block: strip_stopwords(block,stopwords),blocks,args.repeat)
+    #cold: one pass that fills the token cache, warm: later passes over the same corpus
+    tokenizer = Tokenizer(stopwords)
+    cold_time, _ = best_time(tokenizer.words,blocks,1)
+    new_time, new_bios = best_time(tokenizer.words,blocks,args.repeat)
+    print(f"strip_stopwords:   {old_time:.4f}s")
+    print(f"Tokenizer (warm):  {new_time:.4f}s  {old_time/new_time:.1f}x")
+    print(f"Tokenizer (cold):  {cold_time:.4f}s  {old_time/cold_time:.1f}x")
+    print("Same word sets" if old_bios == new_bios else "Word sets differ!")
@@ -0,0 +1,89 @@
+"""
+Author: Kaikai Du
+k-fold cross-validation and smoothing sweep for the Naive Bayes classifier of textClassifier.py
+Usage: python3 crossval.py <input_filepath> [--folds 5] [--smoothing 0.01 0.1 0.5] [--seed 0]
+The corpus is tokenised and counted once; the training counts of every fold are the corpus
+totals minus the counts of the held-out fold, and for every smoothing value only the
+likelihood arrays are recomputed.
+NOTE: requires stopwords.txt and numpy, like textClassifier.py
+"""
+
+import argparse
+import time
+import numpy as np
+
+from textClassifier import parse_stopwords, open_corpus, iter_bios, Tokenizer
+from vector_model import VectorModel, DocTermMatrix
+
+def word_counts(mat,y,rows,n_cats: int):
+    #(bios per category, vocab x categories bios containing the word) over the given rows
+    sub = mat.rows(rows)
+    cats = y[rows]
+    pairs = sub.indices*n_cats + cats[sub.row_ids()]
+    counts = np.bincount(pairs,minlength = mat.n_cols*n_cats).reshape(mat.n_cols,n_cats)
+    return np.bincount(cats,minlength = n_cats), counts
+
+def fold_model(total,fold,categories: list,vocab):
+    """
+    VectorModel trained on everything outside the fold, from count differences only.
+    Categories without training bios are left out as textClassifier would never see them,
+    words without training bios get all-zero likelihoods like words unseen in training.
+    """
+    cat_counts = total[0] - fold[0]
+    counts = total[1] - fold[1]
+    present = np.flatnonzero(cat_counts > 0)
+    model = VectorModel()
+    model.vocab = vocab
+    model.categories = [categories[c] for c in present]
+    model.cat_ids = {cat:i for i,cat in enumerate(model.categories)}
+    model.cat_counts = cat_counts[present]
+    model.word_counts = counts[:,present]
+    return model, counts.sum(axis = 1) > 0
+
+def accuracy(model,seen,mat,targets: list,e: float):
+    model.set_smoothing(e)
+    prior, likelihood = model.tables()
+    likelihood[~seen] = 0.0
+    probs = model.probabilities(model.score_matrix(mat))
+    predicted = np.array(model.categories,dtype = object)[probs.argmax(axis = 1)]
+    return float(np.mean(predicted == targets)) if len(targets) else 0.0
+
+def crossval(args):
+    start = time.perf_counter()
+    with open_corpus(args.input_filepath) as file:
+        bios = list(iter_bios(file,Tokenizer(parse_stopwords())))
+    corpus = VectorModel()
+    y = corpus.category_ids([b[1] for b in bios])
+    mat = DocTermMatrix.from_docs([b[2] for b in bios],corpus.vocab,grow = True)
+    n_cats = len(corpus.categories)
+    total = word_counts(mat,y,np.arange(len(bios)),n_cats)
+    print(f"{len(bios)} bios, {len(corpus.vocab)} words, {n_cats} categories: tokenised and counted in {time.perf_counter()-start:.3f}s")
+
+    order = np.random.default_rng(args.seed).permutation(len(bios)) if args.shuffle else np.arange(len(bios))
+    folds = np.array_split(order,args.folds)
+    start = time.perf_counter()
+    models = []
+    for rows in folds:
+        model, seen = fold_model(total,word_counts(mat,y,rows,n_cats),corpus.categories,corpus.vocab)
+        targets = np.array([bios[r][1] for r in rows],dtype = object)
+        models.append((model,seen,mat.rows(rows),targets))
+    print(f"{args.folds} folds counted by subtraction in {time.perf_counter()-start:.3f}s")
+    print()
+
+    header = f"{'e':>8}{'accuracy':>10}{'std':>8}{'time(s)':>10}"
+    print(header)
+    print("-"*len(header))
+    for e in args.smoothing:
+        start = time.perf_counter()
+        scores = [accuracy(model,seen,fold_mat,targets,e) for model,seen,fold_mat,targets in models]
+        elapsed = time.perf_counter()-start
+        print(f"{e:>8g}{np.mean(scores):>10.4f}{np.std(scores):>8.4f}{elapsed:>10.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "k-fold cross-validation of the text classifier over smoothing values")
+    parser.add_argument('input_filepath')
+    parser.add_argument('--folds',type = int,default = 5)
+    parser.add_argument('--smoothing',type = float,nargs = '+',default = [0.01,0.05,0.1,0.2,0.5],help = "values of e to evaluate")
+    parser.add_argument('--shuffle',action = 'store_true',help = "assign bios to folds at random instead of in file order")
+    parser.add_argument('--seed',type = int,default = 0)
+    crossval(parser.parse_args())
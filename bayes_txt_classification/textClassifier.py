@@ -3,10 +3,16 @@ Author: Kaikai Du
 NOTE: requires stopwords.txt and numpy
 """
 
-import sys
+import argparse
+import collections
+import gzip
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import re
 
+from vector_model import VectorModel, load_model as load_saved_model
+
 def parse_stopwords():
     stopwords = set()
     try:
@@ -42,6 +48,36 @@ def strip_stopwords(raw_bio,stopwords):
                 bio.add(word)
     return bio
 
+class Tokenizer:
+    """
+    Faster strip_stopwords, shared by training and testing: punctuation is removed from a whole
+    line with one precompiled regex and every distinct token is checked against the stopwords
+    and the length limit once, later occurrences are a single cache lookup.
+    """
+    NON_ALPHA = re.compile(r'[^a-zA-Z\s]')
+
+    def __init__(self,stopwords):
+        self.stopwords = stopwords
+        self.cache = {} #token -> cleaned word, None if it is dropped
+
+    def clean(self,token):
+        word = token if len(token) > 2 and token not in self.stopwords else None
+        self.cache[token] = word
+        return word
+
+    def words(self,raw_bio):
+        #same set strip_stopwords returns; deleting non letters line-wide before split()
+        #equals deleting them per token since whitespace is kept
+        bio = set()
+        cache = self.cache
+        sub = self.NON_ALPHA.sub
+        for raw_line in raw_bio:
+            for token in sub('',raw_line).split():
+                word = cache[token] if token in cache else self.clean(token)
+                if word is not None:
+                    bio.add(word)
+        return bio
+
 def update_occurrences(word_occ, unique_words,cat):
     for word in unique_words:
         if word not in word_occ:
@@ -50,7 +86,7 @@ def update_occurrences(word_occ, unique_words,cat):
             word_occ[word][cat] = 0
         word_occ[word][cat] += 1
     
-def train(file,stopwords,N,e):
+def train(file,tokenizer,N,e):
     n_bios = 0
     n_categories = {}
     word_occ = {} #track category occurences of each word. word -> dict{category -> # occurences} it appears in 
@@ -60,7 +96,7 @@ def train(file,stopwords,N,e):
         block = get_block(file)
         name,cat = block[0],block[1]
         n_categories[cat] = n_categories.get(cat,0.0) + 1
-        unique_words = strip_stopwords(block[2:],stopwords)
+        unique_words = tokenizer.words(block[2:])
         update_occurrences(word_occ,unique_words,cat)
         #update iterators 
         n_bios += 1
@@ -110,7 +146,7 @@ def evaluate_prediction(name,preds,target):
 
     return 1 if correct else 0
 
-def test(file,stopwords,N,e,probas,n_categories):
+def test(file,tokenizer,N,e,probas,n_categories):
     #the file pointer should be at the correct spot since this is the same iterator that was used in training
     #it should remain where the training stopped
     #probas corresponds directly to probas from train
@@ -121,7 +157,7 @@ def test(file,stopwords,N,e,probas,n_categories):
     while block is not None:
         full_name = block[0]
         target = block[1] #target category i.e. correct answer
-        unique_words = strip_stopwords(block[2:],stopwords)
+        unique_words = tokenizer.words(block[2:])
         c_i = {cat : float(L(probas[0].get(cat,0.0),cat,probas[1],unique_words)) for cat in cats}
         m = min(list(c_i.values()))
         xi_per_category = {cat : float((np.exp2(m-c_i[cat]) if c_i[cat] - m < 7 else 0.0))for cat in cats}
@@ -132,22 +168,170 @@ def test(file,stopwords,N,e,probas,n_categories):
         n_total += 1
     print(f"Overall accuracy: {num_correct} out of {n_total} = {float(num_correct)/float(n_total)}")
 
-def run(filepath,stopwords,N,e = 0.1):
+def open_corpus(filepath):
+    #corpora ending in .gz are decompressed on the fly
+    if filepath.endswith('.gz'):
+        return gzip.open(filepath,'rt')
+    return open(filepath,'r')
+
+def iter_blocks(file,N = np.inf):
+    #up to N raw blocks: name, category, then the bio lines
+    n_bios = 0
+    while n_bios < N:
+        block = get_block(file)
+        if block is None:
+            return
+        yield block
+        n_bios += 1
+
+def iter_bios(file,tokenizer,N = np.inf):
+    #up to N (name, category, word set) triples, the block layout train and test read
+    for block in iter_blocks(file,N):
+        yield block[0],block[1],tokenizer.words(block[2:])
+
+def fit_stream(model,bios,chunk_size):
+    #partial_fit over chunk_size bios at a time, only one chunk of word sets is held in memory
+    while True:
+        chunk = list(itertools.islice(bios,chunk_size))
+        if not chunk:
+            return model
+        model.partial_fit([b[2] for b in chunk],[b[1] for b in chunk])
+
+def train_vectorised(file,tokenizer,N,e,chunk_size = 10000,model = None):
+    #same model as train, built as count arrays (see vector_model.py); an existing model is updated
+    model = model if model is not None else VectorModel(e)
+    return fit_stream(model,iter_bios(file,tokenizer,N),chunk_size)
+
+def train_files(model,filepaths,tokenizer,chunk_size = 10000):
+    #streams every bio of the given corpora into model
+    for filepath in filepaths:
+        with open_corpus(filepath) as file:
+            fit_stream(model,iter_bios(file,tokenizer),chunk_size)
+    return model
+
+"""
+Parallel training: the parent reads raw blocks and hands chunks of them to a process pool,
+every worker tokenises its chunk and fits a VectorModel of counts, and the parent merges
+the returned count tables in chunk order.
+"""
+_tokenizer = None
+
+def _init_worker(stopwords):
+    #each worker keeps one Tokenizer (and its cache) for all the chunks it gets
+    global _tokenizer
+    _tokenizer = Tokenizer(stopwords)
+
+def _fit_chunk(blocks,e):
+    return VectorModel(e).partial_fit([_tokenizer.words(b[2:]) for b in blocks],[b[1] for b in blocks])
+
+def train_parallel(model,blocks,stopwords,workers,chunk_size = 10000):
+    """
+    Fits model on an iterable of raw blocks with workers processes. At most 2*workers chunks
+    are in flight, so the corpus is never held in memory as a whole.
+    """
+    with ProcessPoolExecutor(max_workers = workers,initializer = _init_worker,initargs = (stopwords,)) as pool:
+        pending = collections.deque()
+        while True:
+            chunk = list(itertools.islice(blocks,chunk_size))
+            if chunk:
+                pending.append(pool.submit(_fit_chunk,chunk,model.e))
+            #merge in submission order, the result is the same as a serial fit
+            while pending and (not chunk or len(pending) >= 2*workers):
+                model.merge(pending.popleft().result())
+            if not chunk:
+                return model
+
+def predict_stream(bios,model,batch_size = 1000,k = 1):
+    """
+    Generator over (name, category, word set) triples: yields name, target, the top k categories,
+    their probabilities and all probabilities per bio, scoring batch_size bios at a time.
+    """
+    #model.predict_batches does the batching; the names and targets of the bios it has
+    #pulled wait here until their batch comes back
+    labels = collections.deque()
+    def words():
+        for full_name,target,bio in bios:
+            labels.append((full_name,target))
+            yield bio
+    for top, top_probs, probs in model.predict_batches(words(),batch_size,k):
+        for t,tp,p in zip(top,top_probs,probs):
+            full_name,target = labels.popleft()
+            yield full_name,target,t,tp,p
+
+def test_vectorised(file,tokenizer,model,quiet = False,batch_size = 1000,k = 1):
+    #reports the remaining bios like test, or with quiet only the accuracy summary at the end
+    num_correct = 0
+    num_top_k = 0
+    n_total = 0
+    for full_name,target,top,top_probs,probs in predict_stream(iter_bios(file,tokenizer),model,batch_size,k):
+        n_total += 1
+        num_top_k += target in top
+        if quiet:
+            num_correct += top[0] == target
+            continue
+        preds = {cat : float(probs[j]) for j,cat in enumerate(model.categories)}
+        num_correct += evaluate_prediction(full_name,preds,target)
+        if k > 1:
+            print("Top " + " ".join(f"{cat}: {p:.2f}" for cat,p in zip(top,top_probs)))
+            print()
+    print(f"Overall accuracy: {num_correct} out of {n_total} = {float(num_correct)/float(n_total)}")
+    if k > 1:
+        print(f"Top {k} accuracy: {num_top_k} out of {n_total} = {float(num_top_k)/float(n_total)}")
+
+def run(filepath,stopwords,N,e = 0.1,vectorised = False,chunk_size = 10000,extra_train = (),workers = 1,
+        save_model = None,load_model = None,quiet = False,batch_size = 1000,top_k = 1,compact = False,min_df = 1):
     if N == -1:
         N = np.inf
+    tokenizer = Tokenizer(stopwords)
     try:
-        with open(filepath,'r') as file:
-           probas,n_categories = train(file,stopwords,N,e)
-           test(file,stopwords,N,e,probas,n_categories)
+        with open_corpus(filepath) as file:
+            if load_model is not None:
+                #the first N bios are still skipped so a saved model is tested on the same split
+                model = load_saved_model(load_model)
+                for _ in iter_blocks(file,N):
+                    pass
+                test_vectorised(file,tokenizer,model,quiet,batch_size,top_k)
+                return
+            if workers > 1:
+                model = train_parallel(VectorModel(e),iter_blocks(file,N),stopwords,workers,chunk_size)
+                for extra_filepath in extra_train:
+                    with open_corpus(extra_filepath) as extra_file:
+                        train_parallel(model,iter_blocks(extra_file),stopwords,workers,chunk_size)
+            elif vectorised or extra_train or save_model is not None or quiet or top_k > 1 or compact or min_df > 1:
+                model = train_vectorised(file,tokenizer,N,e,chunk_size)
+                train_files(model,extra_train,tokenizer,chunk_size)
+            else:
+                probas,n_categories = train(file,tokenizer,N,e)
+                test(file,tokenizer,N,e,probas,n_categories)
+                return
+            if compact or min_df > 1:
+                model = model.compact(min_df)
+            if save_model is not None:
+                model.save(save_model)
+            test_vectorised(file,tokenizer,model,quiet,batch_size,top_k)
 
     except Exception as e:
         print(f"Error: {e} occured during execution")
 
 if __name__ == "__main__":
-    if(len(sys.argv) != 3):
-        print("Correct usage: python3 textClassifier.py <input_filepath> <training set partition>")
-        sys.exit(1)
-    input_filepath = sys.argv[1]
-    training_set_size = int(sys.argv[2])
+    parser = argparse.ArgumentParser(description = "Naive Bayes classifier for category-labelled bios")
+    parser.add_argument('input_filepath')
+    parser.add_argument('training_set_size',type = int,help = "bios used for training, -1 for all")
+    parser.add_argument('--vectorised',action = 'store_true',help = "train and score with the sparse count arrays of vector_model.py")
+    parser.add_argument('--chunk-size',type = int,default = 10000,help = "bios per vectorised training update")
+    parser.add_argument('--extra-train',nargs = '+',default = [],metavar = 'FILE',
+                        help = "more corpora (.gz allowed) streamed into the model before testing, implies --vectorised")
+    parser.add_argument('--workers',type = int,default = 1,help = "training processes, more than 1 implies --vectorised")
+    parser.add_argument('--save-model',metavar = 'FILE',help = "write the trained model (implies --vectorised)")
+    parser.add_argument('--load-model',metavar = 'FILE',help = "score with a saved model instead of training, the first N bios are skipped")
+    parser.add_argument('--quiet',action = 'store_true',help = "only print the accuracy summary (implies --vectorised)")
+    parser.add_argument('--batch-size',type = int,default = 1000,help = "bios scored per batch")
+    parser.add_argument('--top-k',type = int,default = 1,help = "also report the k most probable categories (implies --vectorised)")
+    parser.add_argument('--compact',action = 'store_true',help = "score with default likelihoods plus sparse deltas (implies --vectorised)")
+    parser.add_argument('--min-df',type = int,default = 1,help = "drop words found in fewer training bios, implies --compact")
+    args = parser.parse_args()
     stopwords = parse_stopwords()
-    run(input_filepath,stopwords,training_set_size)
\ No newline at end of file
+    run(args.input_filepath,stopwords,args.training_set_size,vectorised = args.vectorised,
+        chunk_size = args.chunk_size,extra_train = args.extra_train,workers = args.workers,
+        save_model = args.save_model,load_model = args.load_model,quiet = args.quiet,
+        batch_size = args.batch_size,top_k = args.top_k,compact = args.compact,min_df = args.min_df)
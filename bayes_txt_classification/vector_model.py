@@ -0,0 +1,425 @@
+"""
+Author: Kaikai Du
+Vectorised Naive Bayes for textClassifier.py: words interned to integer ids, bios held as a
+CSR document-term matrix in plain NumPy arrays and the likelihoods as a dense vocab x category table
+(VectorModel) or as per-category defaults plus sparse deltas (CompactModel)
+NOTE: requires numpy
+"""
+
+import itertools
+import json
+import numpy as np
+
+#saved model layout: MAGIC, uint64 header length, JSON header, then the arrays listed in
+#the header, each starting at a multiple of ALIGN so they can be memory-mapped in place
+MAGIC = b'NBMODEL1'
+ALIGN = 64
+
+def write_arrays(path: str,header: dict,arrays: list):
+    #header plus the (name, array) pairs in the saved model layout described at the top
+    #the header has to know where the arrays start, which depends on its own length;
+    #offsets are relative to the end of the header, padded to ALIGN
+    specs = {}
+    offset = 0
+    for name,arr in arrays:
+        specs[name] = {'dtype': arr.dtype.str,'shape': arr.shape,'offset': offset}
+        offset += -(-arr.nbytes // ALIGN) * ALIGN
+    header = json.dumps(dict(header,arrays = specs)).encode()
+    start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+    with open(path,'wb') as file:
+        file.write(MAGIC)
+        file.write(np.uint64(len(header)).astype('<u8').tobytes())
+        file.write(header)
+        for name,arr in arrays:
+            file.seek(start + specs[name]['offset'])
+            file.write(arr.tobytes())
+        file.truncate(start + offset)
+
+def read_arrays(path: str,kind: str = None):
+    #(header, name -> read-only memmap) of a file written by write_arrays
+    with open(path,'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a saved model")
+        header_len = int(np.frombuffer(file.read(8),dtype = '<u8')[0])
+        header = json.loads(file.read(header_len))
+    if kind is not None and header.get('kind','dense') != kind:
+        raise ValueError(f"{path} holds a {header.get('kind','dense')} model, not a {kind} one")
+    start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+    arrays = {}
+    for name,spec in header['arrays'].items():
+        shape = tuple(spec['shape'])
+        if 0 in shape:
+            arrays[name] = np.zeros(shape,dtype = spec['dtype'])
+        else:
+            arrays[name] = np.memmap(path,dtype = spec['dtype'],mode = 'r',offset = start + spec['offset'],shape = shape)
+    return header, arrays
+
+def load_model(path: str):
+    #VectorModel or CompactModel, whichever was saved in path
+    header, _ = read_arrays(path)
+    if header.get('kind','dense') == 'compact':
+        return CompactModel.load(path)
+    return VectorModel.load(path)
+
+def sorted_vocab(words: list):
+    #(sorted fixed-width byte array of the words, order of the words it was sorted by)
+    order = sorted(range(len(words)),key = lambda i: words[i])
+    width = max((len(w) for w in words),default = 1)
+    return np.array([words[i] for i in order],dtype = f'S{width}'), order
+
+class Vocabulary:
+    def __init__(self):
+        self.ids = {}
+        self.words = []
+
+    def __len__(self):
+        return len(self.words)
+
+    def intern(self,word: str):
+        #id of word, adding it if it is new
+        i = self.ids.get(word)
+        if i is None:
+            i = len(self.words)
+            self.ids[word] = i
+            self.words.append(word)
+        return i
+
+    def encode(self,words,grow: bool = False):
+        #sorted ids of the words; unknown words are dropped unless grow is set
+        if grow:
+            ids = [self.intern(w) for w in words]
+        else:
+            ids = [self.ids[w] for w in words if w in self.ids]
+        return np.array(sorted(ids),dtype = np.int64)
+
+class MappedVocabulary:
+    """
+    Read-only vocabulary of a loaded model: the words as one sorted fixed-width byte array
+    (usually a memmap), looked up with searchsorted instead of a dict, so nothing is built per word on load.
+    """
+    def __init__(self,words):
+        self.sorted_words = words
+
+    def __len__(self):
+        return len(self.sorted_words)
+
+    @property
+    def words(self):
+        return [w.decode('ascii') for w in self.sorted_words]
+
+    def intern(self,word: str):
+        raise TypeError("a loaded model's vocabulary is read-only")
+
+    def encode(self,words,grow: bool = False):
+        if grow:
+            self.intern(None)
+        width = self.sorted_words.dtype.itemsize
+        #longer words can't be in the vocabulary and would be truncated by the cast
+        words = [w for w in words if len(w) <= width]
+        if not words or not len(self):
+            return np.empty(0,dtype = np.int64)
+        keys = np.array(words,dtype = self.sorted_words.dtype)
+        ids = np.searchsorted(self.sorted_words,keys)
+        found = ids < len(self)
+        found[found] = self.sorted_words[ids[found]] == keys[found]
+        return np.sort(ids[found]).astype(np.int64)
+
+class DocTermMatrix:
+    """
+    Binary document-term matrix in CSR form: the word ids of row r are indices[indptr[r]:indptr[r+1]].
+    Every stored entry is 1 (a bio either contains a word or not), so no data array is kept.
+    """
+    def __init__(self,indptr,indices,n_cols: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.n_cols = n_cols
+
+    @classmethod
+    def from_docs(cls,docs,vocab: Vocabulary,grow: bool = False):
+        #docs: iterable of word sets, as returned by strip_stopwords
+        rows = [vocab.encode(words,grow) for words in docs]
+        indptr = np.zeros(len(rows)+1,dtype = np.int64)
+        indptr[1:] = np.cumsum([len(r) for r in rows])
+        indices = np.concatenate(rows) if rows else np.empty(0,dtype = np.int64)
+        return cls(indptr,indices,len(vocab))
+
+    @property
+    def n_rows(self):
+        return len(self.indptr)-1
+
+    def rows(self,rows):
+        #the matrix of the given rows, in that order
+        starts = self.indptr[rows]
+        lens = self.indptr[np.asarray(rows)+1] - starts
+        indptr = np.zeros(len(lens)+1,dtype = np.int64)
+        indptr[1:] = np.cumsum(lens)
+        pos = np.arange(indptr[-1]) - np.repeat(indptr[:-1] - starts,lens)
+        return DocTermMatrix(indptr,self.indices[pos],self.n_cols)
+
+    def row_ids(self):
+        #row of every stored entry
+        return np.repeat(np.arange(self.n_rows),np.diff(self.indptr))
+
+    def dot(self,dense):
+        #self @ dense for a (n_cols, k) array, summing the dense rows each document selects
+        out = np.zeros((self.n_rows,dense.shape[1]))
+        starts = self.indptr[:-1]
+        nonempty = starts < self.indptr[1:]
+        if self.indices.size:
+            #empty rows are skipped, so consecutive starts bracket exactly one row's entries
+            out[nonempty] = np.add.reduceat(dense[self.indices],starts[nonempty],axis = 0)
+        return out
+
+
+class Scorer:
+    """
+    Prediction methods shared by the model representations, which provide categories and
+    scores(docs) -> (n docs, n categories) array of L(c|bio)
+    """
+    def probabilities(self,scores):
+        #textClassifier.test's normalisation: 2^(m - L), cut to 0 once L - m reaches 7
+        #rounded so that ties which only differ by summation order stay ties and argmax
+        #picks the first category, like max() over test's dict
+        diff = np.round(scores - scores.min(axis = 1,keepdims = True),9)
+        x = np.where(diff < 7,np.exp2(-diff),0.0)
+        return x / x.sum(axis = 1,keepdims = True)
+
+    def predict(self,docs):
+        probs = self.probabilities(self.scores(docs))
+        return [self.categories[i] for i in probs.argmax(axis = 1)], probs
+
+    def predict_top(self,docs,k: int = 1):
+        """
+        The k most probable categories of every doc, best first, ties going to the earlier category.
+        Returns category names (n, k), their probabilities (n, k) and all probabilities (n, categories).
+        """
+        probs = self.probabilities(self.scores(docs))
+        k = min(k,len(self.categories))
+        top = np.argsort(-probs,axis = 1,kind = 'stable')[:,:k]
+        return np.array(self.categories,dtype = object)[top], np.take_along_axis(probs,top,axis = 1), probs
+
+    def predict_batches(self,docs,batch_size: int = 1000,k: int = 1):
+        #generator of predict_top over any iterable of docs, batch_size docs at a time
+        docs = iter(docs)
+        while True:
+            batch = list(itertools.islice(docs,batch_size))
+            if not batch:
+                return
+            yield self.predict_top(batch,k)
+
+class VectorModel(Scorer):
+    """
+    Same model as textClassifier.train: category likelihoods -log2((freq_c + e)/(1 + n_cats*e))
+    and word likelihoods -log2((freq_w_c + e)/(1 + 2e)), where freq_w_c is the fraction of
+    category c's bios containing w. Words never seen in training score 0 in every category.
+    """
+    def __init__(self,e: float = 0.1):
+        self.e = e
+        self.vocab = Vocabulary()
+        self.categories = []
+        self.cat_ids = {}
+        self.cat_counts = np.zeros(0,dtype = np.int64) #bios per category
+        self.word_counts = np.zeros((0,0),dtype = np.int64) #vocab x categories, bios of c containing w
+        #derived from the counts on first use after an update, see tables()
+        self.prior = None
+        self.likelihood = None
+
+    def fit(self,docs: list,cats: list):
+        self.__init__(self.e)
+        return self.partial_fit(docs,cats)
+
+    def partial_fit(self,docs: list,cats: list):
+        """
+        Adds a chunk of bios to the counts; new words and categories extend the arrays.
+        Only the counts are touched, the likelihoods are recomputed when next needed.
+        """
+        y = self.category_ids(cats)
+        n_cats = len(self.categories)
+
+        mat = DocTermMatrix.from_docs(docs,self.vocab,grow = True)
+        self.grow(len(self.vocab),n_cats)
+        self.cat_counts += np.bincount(y,minlength = n_cats)
+        #count each observed (word, category) pair once instead of a dict update per word
+        pairs, counts = np.unique(mat.indices*n_cats + y[mat.row_ids()],return_counts = True)
+        self.word_counts.reshape(-1)[pairs] += counts
+        self.prior = None
+        self.likelihood = None
+        return self
+
+    def merge(self,other):
+        """
+        Adds the counts of another model, e.g. one fitted on a different shard of the corpus.
+        Counts are plain sums over bios, so merging shard models gives exactly the counts of
+        fitting all of them, with words and categories ordered as if the shards were read in turn.
+        """
+        cmap = self.category_ids(other.categories)
+        wmap = np.array([self.vocab.intern(w) for w in other.vocab.words],dtype = np.int64)
+        self.grow(len(self.vocab),len(self.categories))
+        self.cat_counts[cmap] += other.cat_counts
+        #every word and category appears once in other, so the fancy-indexed += doesn't drop repeats
+        self.word_counts[np.ix_(wmap,cmap)] += other.word_counts
+        self.prior = None
+        self.likelihood = None
+        return self
+
+    def category_ids(self,cats):
+        #ids of the categories, new ones are appended in order of first appearance
+        for cat in cats:
+            if cat not in self.cat_ids:
+                self.cat_ids[cat] = len(self.categories)
+                self.categories.append(cat)
+        return np.array([self.cat_ids[cat] for cat in cats],dtype = np.int64)
+
+    def grow(self,n_words: int,n_cats: int):
+        #zero-extends the count arrays to n_words x n_cats
+        if self.word_counts.shape == (n_words,n_cats):
+            return
+        word_counts = np.zeros((n_words,n_cats),dtype = np.int64)
+        old_words, old_cats = self.word_counts.shape
+        word_counts[:old_words,:old_cats] = self.word_counts
+        self.word_counts = word_counts
+        self.cat_counts = np.concatenate([self.cat_counts,np.zeros(n_cats-len(self.cat_counts),dtype = np.int64)])
+
+    def set_smoothing(self,e: float):
+        self.e = e
+        self.prior = None
+        self.likelihood = None
+
+    def tables(self):
+        #(prior, likelihood), recomputed only if the counts or e changed since the last call
+        if self.likelihood is None:
+            self.compute_likelihoods()
+        return self.prior, self.likelihood
+
+    def compute_likelihoods(self):
+        e = self.e
+        n_cats = len(self.categories)
+        freq_c = self.cat_counts / self.cat_counts.sum()
+        self.prior = -np.log2((freq_c + e) / (1 + n_cats*e))
+        freq_w_c = self.word_counts / self.cat_counts
+        self.likelihood = -np.log2((freq_w_c + e) / (1 + 2*e))
+
+    def compact(self,min_df: int = 1):
+        return CompactModel.from_model(self,min_df)
+
+    def save(self,path: str):
+        """
+        Writes the vocabulary (sorted, fixed-width ASCII, as the tokenizer only keeps letters),
+        the counts, priors and likelihoods in one binary file, rows in sorted word order.
+        """
+        prior, likelihood = self.tables()
+        vocab, order = sorted_vocab(self.vocab.words)
+        arrays = [
+            ('vocab',vocab),
+            ('cat_counts',np.asarray(self.cat_counts,dtype = '<i8')),
+            ('word_counts',np.asarray(self.word_counts,dtype = '<i8')[order]),
+            ('prior',np.asarray(prior,dtype = '<f8')),
+            ('likelihood',np.asarray(likelihood,dtype = '<f8')[order]),
+        ]
+        write_arrays(path,{'kind': 'dense','e': self.e,'categories': self.categories},arrays)
+
+    @classmethod
+    def load(cls,path: str):
+        """
+        Model saved by save, its arrays memory-mapped read-only: loading reads only the header,
+        pages are shared between processes scoring with the same file.
+        The loaded model scores and predicts, it can't be updated with partial_fit.
+        """
+        header, arrays = read_arrays(path,'dense')
+        model = cls(header['e'])
+        model.vocab = MappedVocabulary(arrays['vocab'])
+        model.categories = header['categories']
+        model.cat_ids = {cat:i for i,cat in enumerate(model.categories)}
+        model.cat_counts = arrays['cat_counts']
+        model.word_counts = arrays['word_counts']
+        model.prior = arrays['prior']
+        model.likelihood = arrays['likelihood']
+        return model
+
+    def scores(self,docs):
+        #L(c|bio) for every bio and category, one sparse-dense product for the whole set
+        return self.score_matrix(DocTermMatrix.from_docs(docs,self.vocab))
+
+    def score_matrix(self,mat):
+        #scores of bios already encoded with this model's vocabulary
+        prior, likelihood = self.tables()
+        return prior + mat.dot(likelihood)
+
+class CompactModel(Scorer):
+    """
+    Scoring-only form of a VectorModel. A word's likelihood in a category none of whose bios
+    contain it is the same for every word, -log2(e/(1 + 2e)), so only that default per category
+    is kept, plus for every observed (word, category) pair its difference from the default,
+    stored by word in CSR form. Memory is O(observed pairs) instead of vocab x categories and
+    scoring a bio only touches the pairs of its words. Words in fewer than min_df training bios
+    are dropped and score 0 like unseen words; min_df = 1 gives exactly the VectorModel's scores.
+    """
+    def __init__(self,e: float,vocab,categories: list,prior,default,indptr,pair_cats,deltas):
+        self.e = e
+        self.vocab = vocab
+        self.categories = categories
+        self.prior = prior
+        self.default = default
+        #the pairs of word w are pair_cats/deltas[indptr[w]:indptr[w+1]]
+        self.indptr = indptr
+        self.pair_cats = pair_cats
+        self.deltas = deltas
+
+    @classmethod
+    def from_model(cls,model,min_df: int = 1):
+        prior, likelihood = model.tables()
+        keep = np.flatnonzero(np.asarray(model.word_counts).sum(axis = 1) >= min_df)
+        words = model.vocab.words
+        vocab = Vocabulary()
+        for i in keep:
+            vocab.intern(words[i])
+        default = np.full(len(model.categories),-np.log2(model.e / (1 + 2*model.e)))
+        #nonzero walks the rows in order, so the pairs come out grouped by word
+        rows, cats = np.nonzero(np.asarray(model.word_counts)[keep])
+        deltas = np.asarray(likelihood)[keep[rows],cats] - default[cats]
+        indptr = np.zeros(len(keep)+1,dtype = np.int64)
+        indptr[1:] = np.cumsum(np.bincount(rows,minlength = len(keep)))
+        return cls(model.e,vocab,list(model.categories),np.asarray(prior),default,indptr,cats.astype(np.int64),deltas)
+
+    @property
+    def nbytes(self):
+        return self.prior.nbytes + self.default.nbytes + self.indptr.nbytes + self.pair_cats.nbytes + self.deltas.nbytes
+
+    def scores(self,docs):
+        mat = DocTermMatrix.from_docs(docs,self.vocab)
+        n_cats = len(self.categories)
+        starts = self.indptr[mat.indices]
+        lens = self.indptr[mat.indices+1] - starts
+        #positions of the pairs of every (doc, word) entry, concatenated
+        first = np.cumsum(lens) - lens
+        pos = np.arange(lens.sum()) - np.repeat(first - starts,lens)
+        doc = np.repeat(mat.row_ids(),lens)
+        out = np.bincount(doc*n_cats + self.pair_cats[pos],weights = self.deltas[pos],minlength = mat.n_rows*n_cats)
+        known = np.diff(mat.indptr)[:,None]
+        return self.prior + known*self.default + out.reshape(mat.n_rows,n_cats)
+
+    def save(self,path: str):
+        #same file layout as VectorModel.save, words and their pair lists in sorted order
+        vocab, order = sorted_vocab(self.vocab.words)
+        lens = np.diff(self.indptr)[order]
+        indptr = np.zeros(len(order)+1,dtype = np.int64)
+        indptr[1:] = np.cumsum(lens)
+        #positions of the pairs in the new word order
+        starts = self.indptr[:-1][order]
+        pos = np.arange(lens.sum()) - np.repeat(indptr[:-1] - starts,lens)
+        arrays = [
+            ('vocab',vocab),
+            ('prior',np.asarray(self.prior,dtype = '<f8')),
+            ('default',np.asarray(self.default,dtype = '<f8')),
+            ('indptr',indptr.astype('<i8')),
+            ('pair_cats',np.asarray(self.pair_cats,dtype = '<i8')[pos]),
+            ('deltas',np.asarray(self.deltas,dtype = '<f8')[pos]),
+        ]
+        write_arrays(path,{'kind': 'compact','e': self.e,'categories': self.categories},arrays)
+
+    @classmethod
+    def load(cls,path: str):
+        #memory-mapped like VectorModel.load
+        header, arrays = read_arrays(path,'compact')
+        return cls(header['e'],MappedVocabulary(arrays['vocab']),header['categories'],arrays['prior'],
+                   arrays['default'],arrays['indptr'],arrays['pair_cats'],arrays['deltas'])
@@ -0,0 +1,139 @@
+'''
+Author: Kaikai Du
+Convergence benchmark for the Monte Carlo learner in mdp.py
+Usage: python3 benchmark.py [--states N] [--terminals K] [--actions A] [--branching B]
+                            [--M 10 50 200] [--rounds R] [--check C] [--trials T] [--seed S]
+'''
+
+import argparse
+import random
+import time
+
+import mdp
+
+def generate_mdp(N,n_term,n_actions,branching,M,rng):
+    #random MDP in the same shape parse_input produces
+    #every (state,action) can reach a terminal state so each round is guaranteed to end
+    params = mdp.Param(N,n_term,n_actions,0,1,M)
+    params.terminal_states = rng.sample(range(N),n_term)
+    for s in params.terminal_states:
+        params.rewards[s] = rng.randint(-10,10)
+    params.states = [s for s in range(N) if s not in params.terminal_states]
+    for a in range(n_actions):
+        params.costs[a] = round(rng.uniform(0.05,0.5),2)
+
+    for s in params.states:
+        params.transitions[s] = {}
+        for a in range(n_actions):
+            k = min(branching,N)
+            successors = rng.sample(range(N),k)
+            if not any(t in params.terminal_states for t in successors):
+                successors[-1] = rng.choice(params.terminal_states)
+            W = [rng.random() + 0.05 for _ in successors]
+            norm = sum(W)
+            T = {}
+            for t,w in zip(successors,W):
+                T[t] = T.get(t,0.0) + w/norm
+            params.transitions[s][a] = T
+    return params
+
+def optimal_policy(params,tol = 1e-9,max_iter = 100000):
+    #value iteration on V(s) = max_a -cost(a) + sum_s' T(s,a,s') V(s'), V(terminal) = reward
+    #this is the quantity the learner's averages estimate (reward minus accumulated cost)
+    V = [0.0]*params.N
+    for s in params.terminal_states:
+        V[s] = float(params.rewards[s])
+    policy = [None]*params.N
+    for _ in range(max_iter):
+        delta = 0.0
+        for s in params.states:
+            q = [-params.costs[a] + sum(p*V[t] for t,p in params.transitions[s][a].items())
+                 for a in range(params.n_actions)]
+            best = max(range(params.n_actions),key = lambda a: q[a])
+            delta = max(delta,abs(q[best]-V[s]))
+            V[s] = q[best]
+            policy[s] = best
+        if delta < tol:
+            break
+    return policy,V
+
+def uniform_action(S,counts,totals,params):
+    #pure exploration baseline, ignores the scores entirely
+    return random.randrange(params.n_actions)
+
+#name -> (action chooser, whether it depends on M)
+LEARNERS = {
+    'explore': (mdp.choose_action,True),
+    'uniform': (uniform_action,False),
+}
+
+def run_until_optimal(params,policy,choose,max_rounds,check_every):
+    #returns (rounds, steps, seconds) at the first check where the best-action table
+    #from print_state agrees with the optimal policy on every non-terminal state
+    S = mdp.Score(params.N,params.n_actions)
+    steps = 0
+    start = time.perf_counter()
+    for rd in range(1,max_rounds+1):
+        steps += mdp.simulate_round(S,params,choose)
+        if rd % check_every == 0:
+            best = mdp.best_actions(S,params.N,params.n_actions)
+            if all(best[s] == policy[s] for s in params.states):
+                return rd,steps,time.perf_counter()-start
+    return None,steps,time.perf_counter()-start
+
+def benchmark(args):
+    rng = random.Random(args.seed)
+    instances = []
+    for _ in range(args.trials):
+        params = generate_mdp(args.states,args.terminals,args.actions,args.branching,args.M[0],rng)
+        policy,_ = optimal_policy(params)
+        instances.append((params,policy))
+
+    print(f"{args.trials} MDPs, {args.states} states, {args.terminals} terminal, "
+          f"{args.actions} actions, branching {args.branching}")
+    header = f"{'learner':<10}{'M':>8}{'solved':>9}{'rounds':>10}{'steps':>12}{'time(s)':>10}{'steps/s':>12}"
+    print(header)
+    print("-"*len(header))
+    for name,(choose,uses_M) in LEARNERS.items():
+        #a learner that ignores M is run once instead of once per M value
+        for M in (args.M if uses_M else [None]):
+            #the learners draw from the global random stream; reseeding per row makes
+            #every row reproducible on its own, whatever rows ran before it
+            random.seed(f"{args.seed}/{name}/{M}")
+            solved = 0
+            total_rounds = total_steps = 0
+            total_time = 0.0
+            all_steps = 0
+            all_time = 0.0
+            for params,policy in instances:
+                params.M = M if M is not None else args.M[0]
+                rounds,steps,elapsed = run_until_optimal(params,policy,choose,args.rounds,args.check)
+                all_steps += steps
+                all_time += elapsed
+                if rounds is not None:
+                    solved += 1
+                    total_rounds += rounds
+                    total_steps += steps
+                    total_time += elapsed
+            throughput = all_steps/all_time if all_time > 0 else 0.0
+            M = M if M is not None else '-'
+            if solved:
+                print(f"{name:<10}{M:>8}{solved:>5}/{len(instances):<3}{total_rounds/solved:>10.0f}"
+                      f"{total_steps/solved:>12.0f}{total_time/solved:>10.3f}{throughput:>12.0f}")
+            else:
+                print(f"{name:<10}{M:>8}{solved:>5}/{len(instances):<3}{'-':>10}{'-':>12}{'-':>10}{throughput:>12.0f}")
+    print()
+    print("rounds/steps/time are averaged over solved instances (time-to-optimal)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Time-to-optimal benchmark for mdp.train")
+    parser.add_argument('--states',type = int,default = 10)
+    parser.add_argument('--terminals',type = int,default = 2)
+    parser.add_argument('--actions',type = int,default = 4)
+    parser.add_argument('--branching',type = int,default = 3)
+    parser.add_argument('--M',type = int,nargs = '+',default = [10,50,200])
+    parser.add_argument('--rounds',type = int,default = 20000,help = "give up after this many rounds")
+    parser.add_argument('--check',type = int,default = 100,help = "compare against the optimal policy every CHECK rounds")
+    parser.add_argument('--trials',type = int,default = 5)
+    parser.add_argument('--seed',type = int,default = 0)
+    benchmark(parser.parse_args())
@@ -113,10 +113,9 @@ def print_matrix(mat,label):
         print("  ".join(parts))
     print()
 
-def print_state(S,n_states,n_actions,round_number):
-    print(f"After {round_number} rounds")
-
-    best_actions = {}
+def best_actions(S,n_states,n_actions):
+    #best action per state by average total, 'U' if some action is untried
+    best = []
     for s in range(n_states):
         best_action = 0
         for a in range(n_actions):
@@ -125,39 +124,51 @@ def print_state(S,n_states,n_actions,round_number):
                 break
             if S.totals[s][a]/S.counts[s][a] > S.totals[s][best_action]/S.counts[s][best_action]:
                 best_action = a 
-        best_actions[str(s)] = str(best_action)
+        best.append(best_action)
+    return best
+
+def print_state(S,n_states,n_actions,round_number):
+    print(f"After {round_number} rounds")
+
+    best = best_actions(S,n_states,n_actions)
     
     print_matrix(S.counts,"Count")
     print_matrix(S.totals,"Total")
     print("Best action: ",end = "")
-    for state,action in best_actions.items():
+    for state,action in enumerate(best):
         print(f"{state}:{action}. ",end = '')
     print()
     print()
 
+def simulate_round(S,params,choose = choose_action):
+    #play one episode from a random non-terminal state and update S
+    #returns the number of transitions simulated
+    T = params.transitions
+    state = random.choice(params.states)
+    cost = 0.0
+    steps = 0
+    visited = set() #set of visited (state,action) pairs (list of tuples)
+    while state not in params.terminal_states:
+        action = choose(state,S.counts,S.totals,params)
+        visited.add((state,action))
+        cost += params.costs[action]
+        possible_next_states = list(T[state][action].keys())
+        W = list(T[state][action].values())
+        state = random.choices(possible_next_states,weights=W,k=1)[0]
+        steps += 1
+
+    reward = params.rewards[state]
+    for state,action in visited:
+        S.counts[state][action]+=1
+        S.totals[state][action]+=(reward-cost)
+    return steps
+
 def train(params):
     S = Score(params.N, params.n_actions)
-    states = params.states
-    T = params.transitions
     n_states = params.N
     n_actions = params.n_actions
     for rd in range(params.n_rounds):
-        #choose random starting state
-        state = random.choice(states)
-        cost = 0.0
-        visited = set() #set of visited (state,action) pairs (list of tuples)
-        while state not in params.terminal_states:
-            action = choose_action(state,S.counts,S.totals,params)
-            visited.add((state,action))
-            cost += params.costs[action]
-            possible_next_states = list(T[state][action].keys())
-            W = list(T[state][action].values())
-            state = random.choices(possible_next_states,weights=W,k=1)[0]
-
-        reward = params.rewards[state]
-        for state,action in visited:
-            S.counts[state][action]+=1
-            S.totals[state][action]+=(reward-cost)
+        simulate_round(S,params)
 
         if rd % params.v == 0:
             #compute average
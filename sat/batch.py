@@ -0,0 +1,137 @@
+'''
+Author: Kaikai Du
+Batch mode for sat.py: solves many mazes across a process pool.
+Usage: python3 batch.py <maze directory | mazes.jsonl | -> [-o results.jsonl] [--workers 4] [--timeout 10]
+A directory is read as one maze per *.txt file (same format as input.txt), a JSONL stream as one
+{"id": ..., "maze": "<input.txt contents>"} object per line ("-" reads stdin). Every instance
+gets one JSON line in the output: its id, status (solved, unsatisfiable, timeout or error),
+the decoded path, the engine used and the encoding/solving statistics. --mode picks the solver
+like sat.py's. Timeouts use SIGALRM, so Unix only.
+'''
+
+import argparse
+import collections
+import itertools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import sat
+
+def read_instances(source):
+    #(id, maze text, error) triples from a directory of mazes or a JSONL file/stdin. A line that
+    #can't be read keeps its line index as id and the reason as error instead of stopping the batch
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith('.txt'):
+                with open(os.path.join(source,name),'r') as f:
+                    yield name, f.read(), None
+        return
+    f = sys.stdin if source == '-' else open(source,'r')
+    try:
+        for i,line in enumerate(f):
+            if line.strip():
+                try:
+                    item = json.loads(line)
+                    yield item.get('id',i), item['maze'], None
+                except (ValueError,KeyError,AttributeError) as e:
+                    yield i, None, f"{type(e).__name__}: {e}"
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def _timeout(signum,frame):
+    raise TimeoutError()
+
+def solve_instance(instance,timeout,mode = 'sat',native_limit = 100000):
+    #runs in a worker: parse, encode and solve one maze within timeout seconds (0 for no limit)
+    maze_id, text, error = instance
+    result = {'id': maze_id}
+    if error is not None:
+        result.update(status = 'error',error = error,time = 0.0)
+        return result
+    start = time.perf_counter()
+    signal.signal(signal.SIGALRM,_timeout)
+    signal.setitimer(signal.ITIMER_REAL,timeout)
+    try:
+        mazeInfo = sat.parse_maze(text)
+        result['steps'] = mazeInfo.nSteps
+        #sat.solve fills in the engine used and, for SAT, the encoding size and times
+        path = sat.solve(mazeInfo,mode,native_limit,result)
+        if path is not None:
+            result.update(status = 'solved',path = path)
+        else:
+            result['status'] = 'unsatisfiable'
+    except TimeoutError:
+        result['status'] = 'timeout'
+    except Exception as e:
+        result.update(status = 'error',error = f"{type(e).__name__}: {e}")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL,0)
+    result['time'] = time.perf_counter()-start
+    return result
+
+def solve_chunk(instances,timeout,mode = 'sat',native_limit = 100000):
+    return [solve_instance(instance,timeout,mode,native_limit) for instance in instances]
+
+def run_batch(args):
+    start = time.perf_counter()
+    statuses = {}
+    out = sys.stdout if args.output == '-' else open(args.output,'w')
+    pending = collections.deque()
+    lock = threading.Lock()
+
+    def write_done(future = None):
+        #writes the results of the finished chunks at the head of pending, in input order; runs as
+        #each chunk finishes, so results go out even while reading the input blocks
+        with lock:
+            while pending and pending[0].done():
+                for result in pending.popleft().result():
+                    statuses[result['status']] = statuses.get(result['status'],0) + 1
+                    out.write(json.dumps(result) + "\n")
+                out.flush()
+
+    try:
+        with ProcessPoolExecutor(max_workers = args.workers) as pool:
+            instances = read_instances(args.source)
+            #at most 2*workers chunks in flight, so the input is read as it is solved, never as a whole
+            while True:
+                chunk = list(itertools.islice(instances,args.chunksize))
+                if not chunk:
+                    break
+                future = pool.submit(solve_chunk,chunk,args.timeout,args.mode,args.native_limit)
+                with lock:
+                    pending.append(future)
+                future.add_done_callback(write_done)
+                while True:
+                    with lock:
+                        head = pending[0] if len(pending) >= 2*args.workers else None
+                    if head is None:
+                        break
+                    wait([head])
+                    write_done()
+            with lock:
+                remaining = list(pending)
+            wait(remaining)
+            write_done()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    total = sum(statuses.values())
+    summary = ", ".join(f"{status} {n}" for status,n in sorted(statuses.items()))
+    print(f"{total} mazes in {time.perf_counter()-start:.2f}s: {summary}",file = sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Solve a batch of mazes with the SAT encoding across processes")
+    parser.add_argument('source',help = "directory of maze .txt files, JSONL file of {id, maze} objects, or - for stdin")
+    parser.add_argument('-o','--output',default = '-',help = "JSONL results file, - for stdout")
+    parser.add_argument('--workers',type = int,default = os.cpu_count())
+    parser.add_argument('--timeout',type = float,default = 0,help = "seconds per maze, 0 for no limit")
+    parser.add_argument('--chunksize',type = int,default = 1,help = "mazes sent to a worker at a time")
+    parser.add_argument('--mode',choices = ['sat','native','hybrid'],default = 'sat',help = "solver, see sat.py")
+    parser.add_argument('--native-limit',type = int,default = 100000,help = "largest search space hybrid mode solves natively")
+    run_batch(parser.parse_args())
@@ -14,12 +14,17 @@ global nAtoms  # number of propositional atoms + 1 (because Python uses zero-bas
 global debug   # Boolean flag for printing trace information
 global strategy # Boolean flag to choose strategy in choosing atom to split on.
                 # True for "clever" strategy, False for just choosing first unbound atom
+global phase    # dict atom -> sign to try first when splitting on that atom (phase hints),
+                # atoms not in it use the sign the strategy picks
 
 strategy = True
+phase = {}
 
 # superroutine: initializes bindings then calls the recursive DPLL.
-def DPLLTop(clauses):
-    global nAtoms
+# phaseHints optionally maps atoms to the sign to try first, e.g. from a known near-solution.
+def DPLLTop(clauses,phaseHints=None):
+    global nAtoms, phase
+    phase = phaseHints if phaseHints is not None else {}
     nAtoms = 0
     for c in clauses:
         for lit in c:
@@ -55,6 +60,8 @@ def DPLL(clauses, bindings,depth):
     else:
         p = 1+bindings[1:].index(0) # first unbound atom
         sign = 1
+    if p in phase:
+        sign = phase[p]
     clausesSaved, bindingsSaved = CopyClauses(clauses,bindings)
     if debug:
         print("\nNo easy cases. Splitting on ", p, ". Sign = ", sign)
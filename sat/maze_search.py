@@ -0,0 +1,128 @@
+'''
+Author: Kaikai Du
+Direct graph search for the treasure maze of sat.py, over states (node, bitmask of treasures held).
+Follows the rules of sat.conjunctivize: start at START at t = 0 holding nothing, move to a
+neighbor on every step, pick up the treasures of every node visited, hold all of them at t = nSteps.
+'''
+
+def treasure_masks(mazeInfo):
+    #node -> bitmask of the listed treasures found there
+    bit = {T:1 << i for i,T in enumerate(mazeInfo.treasures)}
+    return {n:sum(bit[T] for T in mazeInfo.treasure_map.get(n,()) if T in bit) for n in mazeInfo.nodes}
+
+def neighbors(mazeInfo,n):
+    #parse_maze rejects NEXT targets missing from the node list
+    return mazeInfo.node_map[n]
+
+def reconstruct(layers,state):
+    #walks the parent links of the layered searches back from state in the last layer
+    path = []
+    for layer in reversed(layers):
+        path.append(state[0])
+        state = layer[state]
+    return path[::-1]
+
+def search_path(mazeInfo):
+    '''
+    Layered BFS over (node, mask) for exactly nSteps steps. Returns the node at every
+    t = 0..nSteps of a path holding every treasure at the end, or None if there is none
+    (the same instances the SAT encoding finds unsatisfiable).
+    '''
+    masks = treasure_masks(mazeInfo)
+    full = (1 << len(mazeInfo.treasures)) - 1
+    if 'START' not in masks or masks['START']:
+        #At(START,0) would force Has(T,0) for START's treasures, which t = 0 rules out
+        return None
+    layer = {('START',0): None}
+    layers = [layer]
+    for t in range(mazeInfo.nSteps):
+        next_layer = {}
+        for n,mask in layer:
+            for m in neighbors(mazeInfo,n):
+                state = (m,mask | masks[m])
+                if state not in next_layer:
+                    next_layer[state] = (n,mask)
+        layer = next_layer
+        layers.append(layer)
+    for state in layer:
+        if state[1] == full:
+            return reconstruct(layers,state)
+    return None
+
+def shortest_collection(mazeInfo):
+    '''
+    Shortest path (nodes at t = 0..k) from START holding every treasure, ignoring the horizon,
+    or None if the treasures can't all be collected. Its length k is a lower bound on nSteps.
+    '''
+    masks = treasure_masks(mazeInfo)
+    full = (1 << len(mazeInfo.treasures)) - 1
+    if 'START' not in masks or masks['START']:
+        return None
+    start = ('START',0)
+    parent = {start: None}
+    frontier = [start]
+    while frontier:
+        for state in frontier:
+            if state[1] == full:
+                path = []
+                while state is not None:
+                    path.append(state[0])
+                    state = parent[state]
+                return path[::-1]
+        next_frontier = []
+        for n,mask in frontier:
+            for m in neighbors(mazeInfo,n):
+                state = (m,mask | masks[m])
+                if state not in parent:
+                    parent[state] = (n,mask)
+                    next_frontier.append(state)
+        frontier = next_frontier
+    return None
+
+def extend_path(mazeInfo,path,steps):
+    #path followed by a walk of exactly steps more moves, or None if no such walk exists
+    layer = {path[-1]: None}
+    layers = []
+    for t in range(steps):
+        next_layer = {}
+        for n in layer:
+            for m in neighbors(mazeInfo,n):
+                if m not in next_layer:
+                    next_layer[m] = n
+        layer = next_layer
+        layers.append(layer)
+        if not layer:
+            return None
+    if not layers:
+        return path
+    walk = []
+    n = next(iter(layer))
+    for layer in reversed(layers):
+        walk.append(n)
+        n = layer[n]
+    return path + walk[::-1]
+
+def state_count(mazeInfo):
+    #size of the layered search space of search_path
+    return (mazeInfo.nSteps + 1) * len(mazeInfo.nodes) * (1 << len(mazeInfo.treasures))
+
+def phase_hints(mazeInfo,st,path,cnf_AT,cnf_HAS):
+    '''
+    Preferred signs for the SAT atoms along path (nodes at t = 0, 1, ...): At(node,t) true for the
+    path's node and false for the others, Has(T,t) true once T has been picked up and false before.
+    Atoms the encoding doesn't use are skipped.
+    '''
+    hints = {}
+    masks = treasure_masks(mazeInfo)
+    mask = 0
+    for t,n in enumerate(path[:mazeInfo.nSteps+1]):
+        mask |= masks.get(n,0)
+        for node in mazeInfo.nodes:
+            atom = st.str_to_id.get(cnf_AT(node,t))
+            if atom is not None:
+                hints[atom] = 1 if node == n else -1
+        for i,T in enumerate(mazeInfo.treasures):
+            atom = st.str_to_id.get(cnf_HAS(T,t))
+            if atom is not None:
+                hints[atom] = 1 if mask >> i & 1 else -1
+    return hints
@@ -1,11 +1,20 @@
 '''
 Author: Kaikai Du
 No special instructions for running this, just place the maze in the input.txt file to run.
+Optional: python3 sat.py [--mode sat|native|hybrid] [--native-limit N]
+  sat     the propositional encoding solved with DPLL (default)
+  native  the direct (node, treasure mask) search of maze_search.py, no SAT involved
+  hybrid  native search when its state space is at most --native-limit states, otherwise SAT
+          with phase hints from the shortest treasure-collecting path; horizons shorter than
+          that path are reported unsolvable without building the encoding
 '''
 
+import argparse
 import dpll
+import maze_search
 import re 
 import sys
+import time
 
 dpll.debug = False
 dpll.strategy = True
@@ -58,6 +67,10 @@ def parse_maze(text):
             treasure_map[N].add(t)
 
         node_map[N] = ln[index_next+1:]
+        #the encoding would let a move leave the map and leave every later step unconstrained
+        unknown = [m for m in node_map[N] if m not in nodes]
+        if unknown:
+            raise ValueError(f"{N} has NEXT {' '.join(unknown)}, not in the node list")
 
     treasure_source = {t:[] for t in treasures}
     for n in nodes:
@@ -127,8 +140,39 @@ def conjunctivize(mazeInfo):
     
     return clauses, st
 
-def solve(mazeInfo):
-    print()
+def solve(mazeInfo,mode = 'sat',native_limit = 100000,stats = None):
+    """
+    decode_path style path string of a solution, or None if there is none.
+    stats, if given, receives the engine used and the encoding size/times.
+    """
+    stats = stats if stats is not None else {}
+    hints = None
+    if mode == 'hybrid':
+        shortest = maze_search.shortest_collection(mazeInfo)
+        stats['lower_bound'] = len(shortest)-1 if shortest is not None else None
+        if shortest is None or len(shortest)-1 > mazeInfo.nSteps:
+            stats['engine'] = 'bound'
+            return None
+        if maze_search.state_count(mazeInfo) <= native_limit:
+            mode = 'native'
+    if mode == 'native':
+        stats['engine'] = 'native'
+        path = maze_search.search_path(mazeInfo)
+        return " ".join(path) if path is not None else None
+
+    start = time.perf_counter()
+    clauses, st = conjunctivize(mazeInfo)
+    stats.update(engine = 'sat',atoms = st.size(),clauses = len(clauses),encode_time = time.perf_counter()-start)
+    if mode == 'hybrid':
+        #the shortest collecting path padded to the horizon, or just its prefix if it can't be
+        hint_path = maze_search.extend_path(mazeInfo,shortest,mazeInfo.nSteps-(len(shortest)-1)) or shortest
+        hints = maze_search.phase_hints(mazeInfo,st,hint_path,cnf_AT,cnf_HAS)
+    start = time.perf_counter()
+    found,bindings = dpll.DPLLTop(clauses,hints)
+    stats['solve_time'] = time.perf_counter()-start
+    if not found:
+        return None
+    return decode_path(bindings,mazeInfo,st)
 
 def decode_path(bindings,mazeInfo, st):
     path = []
@@ -141,17 +185,20 @@ def decode_path(bindings,mazeInfo, st):
         path.append(here)
     return " ".join(path)
 
-def main():
+def main(mode = 'sat',native_limit = 100000):
     with open('input.txt','r') as f:
         text = f.read()
     
     mazeInfo = parse_maze(text)
-    clauses, st = conjunctivize(mazeInfo)
-    found,bindings = dpll.DPLLTop(clauses)
-    if not found:
+    path = solve(mazeInfo,mode,native_limit)
+    if path is None:
         print("No solution found")
         return
-    print(decode_path(bindings,mazeInfo,st))
+    print(path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description = "Solve the treasure maze in input.txt")
+    parser.add_argument('--mode',choices = ['sat','native','hybrid'],default = 'sat')
+    parser.add_argument('--native-limit',type = int,default = 100000,help = "largest search space hybrid mode solves natively")
+    args = parser.parse_args()
+    main(args.mode,args.native_limit)
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Author: Kaikai Du
+Benchmark for the scheduling search engines on random task sets of increasing size
+Usage: python3 benchmark.py [--sizes 8 12 20 40] [--instances 5] [--ratio 0.95] [--engines id hc ...]
+Reports, for every size and engine, the fraction of instances solved, the mean number of
+evaluations (nodes, moves or DP states, whatever the engine scores) and the mean wall time.
+"""
+import argparse
+import random as rand
+import time
+
+from scheduling import Problem, is_solution
+from id_search import iterative_deepening
+from hc_search import rr_hill_climbing
+from local_search import simulated_annealing, tabu_search
+from bnb_search import branch_and_bound
+from dp_search import dp_schedule
+
+def random_problem(n: int, ratio: float, rng):
+    """
+    n random tasks with the target set to ratio times the best reachable value, so every
+    instance is solvable and ratio close to 1 makes it hard.
+    """
+    tasks = {}
+    for i in range(n):
+        tasks[f"T{i}"] = (rng.randint(1,20),rng.randint(1,10),rng.randint(5,3*n))
+    problem = Problem(tasks,0)
+    _, best = dp_schedule(problem)
+    problem.target = max(int(best*ratio),1)
+    problem.evaluations = 0
+    return problem
+
+def run_engine(name: str, problem: Problem, args, seed: int):
+    rng = rand.Random(seed)
+    if name == "id":
+        return iterative_deepening(problem)
+    if name == "hc":
+        path, _ = rr_hill_climbing(problem,args.restarts,seed = seed)
+        return path
+    if name == "anneal":
+        path, _ = simulated_annealing(problem,max_evals = args.evals,rng = rng)
+        return path
+    if name == "tabu":
+        path, _ = tabu_search(problem,max_evals = args.evals,rng = rng)
+        return path
+    if name == "bnb":
+        return branch_and_bound(problem)
+    path, _ = dp_schedule(problem)
+    return path
+
+ENGINES = ["id","hc","anneal","tabu","bnb","dp"]
+
+def benchmark(args):
+    rng = rand.Random(args.seed)
+    header = f"{'n':>4}  {'engine':<8}{'solved':>8}{'evaluations':>14}{'time(s)':>10}"
+    print(header)
+    print("-"*len(header))
+    for n in args.sizes:
+        problems = [random_problem(n,args.ratio,rng) for _ in range(args.instances)]
+        for name in args.engines:
+            if name == "id" and n > args.id_max:
+                print(f"{n:>4}  {name:<8}{'skipped (n > --id-max)':>32}")
+                continue
+            solved = 0
+            evaluations = 0
+            elapsed = 0.0
+            for k,problem in enumerate(problems):
+                problem.evaluations = 0
+                start = time.perf_counter()
+                path = run_engine(name,problem,args,args.seed+k)
+                elapsed += time.perf_counter()-start
+                evaluations += problem.evaluations
+                if is_solution(problem,path):
+                    solved += 1
+            m = len(problems)
+            print(f"{n:>4}  {name:<8}{solved:>4}/{m:<3}{evaluations/m:>14.0f}{elapsed/m:>10.3f}")
+        print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Compare the scheduling search engines on random task sets")
+    parser.add_argument('--sizes',type = int,nargs = '+',default = [8,12,20,40])
+    parser.add_argument('--instances',type = int,default = 5,help = "random task sets per size")
+    parser.add_argument('--ratio',type = float,default = 0.95,help = "target as a fraction of the best reachable value")
+    parser.add_argument('--engines',nargs = '+',choices = ENGINES,default = ENGINES)
+    parser.add_argument('--id-max',type = int,default = 12,help = "largest size iterative deepening is run on")
+    parser.add_argument('--restarts',type = int,default = 20,help = "hill climbing random restarts")
+    parser.add_argument('--evals',type = int,default = 100000,help = "annealing/tabu evaluation budget")
+    parser.add_argument('--seed',type = int,default = 0)
+    benchmark(parser.parse_args())
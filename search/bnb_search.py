@@ -0,0 +1,97 @@
+"""
+Author: Kaikai Du
+Branch and bound replacement for iterative deepening, reads input.txt like id_search.py
+"""
+from scheduling import Problem, parse_input_file, print_path, format_path, deadline_order
+from tracing import DEBUG
+
+"""
+Branch and bound search functions
+If some order of a set of tasks meets every deadline then earliest-deadline-first order does,
+so instead of searching over orderings we walk the tasks in deadline order and branch on
+taking or skipping each one.
+"""
+def branch_and_bound(problem: Problem):
+    """
+    Returns a path (in deadline order) with value >= target that meets every deadline,
+    or [] if there is none.
+    Running time and value are carried down the recursion, the chosen tasks are a bitmask
+    over the deadline order, and a node is cut when even taking every remaining task that
+    could still meet its deadline would not reach target. Those tasks also have to fit before
+    the latest of their deadlines, so the bound is tightened with a fractional knapsack over
+    that time, filled by value per unit length.
+    """
+    tasks = problem.tasks
+    target = problem.target
+    tracer = problem.tracer
+    trace = tracer.enabled
+    debug = trace and tracer.level >= DEBUG
+    order = deadline_order(tasks)
+    values = [tasks[t][0] for t in order]
+    lengths = [tasks[t][1] for t in order]
+    deadlines = [tasks[t][2] for t in order]
+    n = len(order)
+    by_density = sorted(range(n), key = lambda j: values[j]/lengths[j] if lengths[j] else float('inf'), reverse = True)
+
+    def path_of(used):
+        return [order[j] for j in range(n) if used >> j & 1]
+
+    def search(i, cur_time, value, used):
+        problem.evaluations += 1
+        if trace:
+            tracer.count('node')
+            if debug:
+                tracer.log(format_path(path_of(used),value))
+        if value >= target:
+            return used
+        if i == n:
+            return None
+        #upper bound on the value reachable from here
+        bound = value
+        horizon = cur_time
+        for j in range(i,n):
+            if cur_time + lengths[j] <= deadlines[j]:
+                bound += values[j]
+                horizon = deadlines[j]
+        if bound < target:
+            if trace:
+                tracer.count('pruned')
+            return None
+        bound = value
+        capacity = horizon - cur_time
+        for j in by_density:
+            if j < i or cur_time + lengths[j] > deadlines[j]:
+                continue
+            if lengths[j] <= capacity:
+                capacity -= lengths[j]
+                bound += values[j]
+            else:
+                bound += values[j]*capacity/lengths[j]
+                break
+        if bound < target:
+            if trace:
+                tracer.count('pruned')
+            return None
+        if cur_time + lengths[i] <= deadlines[i]:
+            found = search(i+1, cur_time+lengths[i], value+values[i], used | 1 << i)
+            if found is not None:
+                return found
+        return search(i+1, cur_time, value, used)
+
+    used = search(0,0,0,0)
+    if used is None:
+        return []
+    return path_of(used)
+
+def main():
+    problem = parse_input_file()
+    bnb_return_path = branch_and_bound(problem)
+    problem.tracer.flush()
+    if bnb_return_path == []:
+        print("No solution found")
+    else:
+        print("Found solution: ",end = "")
+        print_path(problem.tasks,bnb_return_path)
+
+if __name__ == "__main__":
+    main()
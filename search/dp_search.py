@@ -0,0 +1,63 @@
+"""
+Author: Kaikai Du
+Exact dynamic programming solver for the scheduling problem, reads input.txt like id_search.py
+"""
+from scheduling import Problem, parse_input_file, print_path, deadline_order
+from tracing import DEBUG
+
+"""
+Dynamic programming functions
+Taken in deadline order, the best schedule of tasks[i:] only depends on how much time has
+already elapsed, so the state is (index in deadline order, elapsed time).
+"""
+def pareto_front(states: dict):
+    #states: elapsed time -> (value, used). Keeps a state only if every state that
+    #finishes earlier has less value, the others can't do anything it can't
+    front = {}
+    best = -1
+    for cur_time in sorted(states):
+        value, used = states[cur_time]
+        if value > best:
+            front[cur_time] = (value, used)
+            best = value
+    return front
+
+def dp_schedule(problem: Problem):
+    """
+    Returns the highest value schedule that meets every deadline (in deadline order) and its value.
+    Each layer maps elapsed time to the best (value, used-task bitmask) reaching it after
+    deciding tasks[:i]; dominated states are dropped after every layer.
+    """
+    tasks = problem.tasks
+    tracer = problem.tracer
+    order = deadline_order(tasks)
+    front = {0: (0, 0)}
+    for i,t in enumerate(order):
+        value, length, deadline = tasks[t]
+        states = dict(front)
+        problem.evaluations += len(front)
+        for cur_time,(total,used) in front.items():
+            end = cur_time + length
+            if end <= deadline and (end not in states or states[end][0] < total + value):
+                states[end] = (total + value, used | 1 << i)
+        front = pareto_front(states)
+        if tracer.enabled:
+            tracer.count('state',len(front))
+            if tracer.level >= DEBUG:
+                tracer.log(f"After {t}: {len(front)} states")
+
+    best_value, best_used = max(front.values())
+    return [order[j] for j in range(len(order)) if best_used >> j & 1], best_value
+
+def main():
+    problem = parse_input_file()
+    dp_return_path, value = dp_schedule(problem)
+    problem.tracer.flush()
+    if value < problem.target:
+        print(f"No solution found, best value = {value}")
+    else:
+        print("Found solution: ",end = "")
+        print_path(problem.tasks,dp_return_path)
+
+if __name__ == "__main__":
+    main()
@@ -3,207 +3,402 @@ Author: Kaikai Du
 Artificial Intelligence Programming Assignment 1
 Hill climbing
 """
-import re 
+import argparse
+import multiprocessing as mp
 import sys
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import random as rand
 
-
-verbose = False
-target = 0
-num_random_restarts = -1
-start_path = []
-
-"""
-Utility functions
-"""
-def parse_input_file():
-    global verbose
-    global target
-    global num_random_restarts
-    global start_path
-    try:
-        table = {}
-        target = 0
-        with open('input.txt','r',encoding = 'utf-8') as file:
-            first_line = file.readline().strip().split(" ")
-            target = int(first_line[0])
-            verbose = True if first_line[1] == 'V' else False
-            if len(first_line) >= 3 and first_line[2].isnumeric():
-                num_random_restarts = int(first_line[2])
-
-            if len(first_line) > 4 and first_line[3] == "//":
-                #has specified starting matrix
-                start_path = [t for t in first_line[4:]]
-
-            else:
-                print("Incorrect input, please specify number of random restarts")
-                sys.exit(0)
-
-            for line in file:
-                line = re.sub(r'\s\s+', ' ',line.strip()).split(' ')
-                table[line[0]] = (int(line[1]),int(line[2]),int(line[3]))
-
-    except Exception as e:
-        print(f"encountered exception {e} while parsing input file")
-    
-    return table
-
-def sum_path(tasks: dict, path: list):
-    total = 0
-    for t in path:
-        total += tasks[t][0]
-    return total
-
-def sum_timestamp(tasks: dict, path: list):
-    total = 0
-    for t in path:
-        total += tasks[t][1]
-    return total
-
-def parse_path(tasks: dict, path: list):
-    total_value = sum_path(tasks,path)
-    timestamp = sum_timestamp(tasks,path)
-    return total_value, timestamp
-
-#error function for hill climbing
-def error(tasks : dict, path: list):
-    global target
-    e = max(target-sum_path(tasks,path),0)
-    cur_time = 0
-    for t in path:
-        length = tasks[t][1]
-        deadline = tasks[t][2]
-        cur_time += length
-        if cur_time > deadline:
-            e += cur_time - deadline
-    return e
-
-def print_path(tasks:dict,path: list):
-    print(*(t for t in path), end = " ")
-    print(f"Value = {sum_path(tasks,path)}")
-
-def print_path_hc(tasks:dict,path: list):
-    print(*(t for t in path), end = " ")
-    print(f"Value = {sum_path(tasks,path)}",end = " ")
-    print(f"Error = {error(tasks,path)}")
-
-def can_schedule(tasks: dict, path: list):
-    cur_time = 0
-    for t in path:
-        cur_time += tasks[t][1]
-        if cur_time > tasks[t][2]:
-            return False
-    return True
+from scheduling import Problem, parse_input_file, sum_path, error, print_path, format_path
+from task_table import TaskTable
+from tracing import Tracer, NULL_TRACER, QUIET, INFO, DEBUG
 
 """
 Hill climbing search functions
 """
-def generate_starting_state(tasks: dict):
+def generate_starting_state(problem: Problem, rng = rand):
+    #rng is anything with the random module's interface, e.g. a seeded random.Random
     starting_nodes = []
-    for t in tasks:
-        n = rand.choice([0,1])
+    for t in problem.tasks:
+        n = rng.choice([0,1])
         if n:
             starting_nodes.append(t)
-    starting_nodes = np.random.permutation(starting_nodes)
-    return list(starting_nodes), sum_path(tasks,starting_nodes), error(tasks,starting_nodes)
-
-def generate_neighbors(tasks: dict, path: list):
-    neighbors = []
-     #remove task
-    for i in range(len(path)):
-        new_path = path[:i] + path[i+1:]
-        if len(new_path) > 0:
-            neighbors.append(new_path)
-
-    #swap every pair
-    for i in range(len(path)-1):
-        new_path = path[:]
-        new_path[i],new_path[i+1] = new_path[i+1],new_path[i]
-        neighbors.append(new_path)
+    rng.shuffle(starting_nodes)
+    return starting_nodes, sum_path(problem.tasks,starting_nodes), error(problem,starting_nodes)
+
+def path_state(tasks: dict, path: list):
+    """
+    One pass over path: total value, finish time of each task, how late each task is,
+    positions of the late tasks and their total lateness. Moves are scored against this instead
+    of rescanning each neighbour. The last entry caches the lateness after every removal,
+    filled by removal_penalties the first time a removal is scored.
+    """
+    value = 0
+    cur_time = 0
+    finish = []
+    lateness = []
+    late = []
+    penalty = 0
+    for i,t in enumerate(path):
+        value += tasks[t][0]
+        cur_time += tasks[t][1]
+        finish.append(cur_time)
+        over = cur_time - tasks[t][2]
+        if over > 0:
+            lateness.append(over)
+            late.append(i)
+            penalty += over
+        else:
+            lateness.append(0)
+    return value, finish, lateness, late, penalty, []
+
+def removal_penalties(tasks: dict, path: list, state: tuple):
+    """
+    Total lateness of the path after removing each task, all n removals in O(n log n).
+    Removing task i with length L makes every later late task j L earlier, so it contributes
+    max(lateness_j - L, 0) = sum of lateness_j > L minus L times their count. Sweeping i from
+    right to left, the lateness of the late tasks after i is kept in Fenwick trees of
+    counts and sums over the distinct lateness values.
+    """
+    _, _, lateness, late, penalty, _ = state
+    values = sorted(set(lateness[j] for j in late))
+    rank = {v:k+1 for k,v in enumerate(values)}
+    size = len(values)
+    counts = [0]*(size+1)
+    sums = [0]*(size+1)
+    right_count = 0
+    right_sum = 0
+    result = [0]*len(path)
+    for i in range(len(path)-1,-1,-1):
+        length = tasks[path[i]][1]
+        #count and sum of the lateness values <= length among the late tasks after i
+        k = bisect_right(values,length)
+        low_count = low_sum = 0
+        while k > 0:
+            low_count += counts[k]
+            low_sum += sums[k]
+            k -= k & -k
+        shifted = (right_sum - low_sum) - length*(right_count - low_count)
+        result[i] = penalty - lateness[i] - right_sum + shifted
+        if lateness[i] > 0:
+            k = rank[lateness[i]]
+            while k <= size:
+                counts[k] += 1
+                sums[k] += lateness[i]
+                k += k & -k
+            right_count += 1
+            right_sum += lateness[i]
+    return result
+
+def generate_moves(tasks: dict, path: list, shuffle: bool = False, rng = rand):
+    """
+    Yields moves one at a time, in the order the neighbours used to be listed in:
+    removals, adjacent swaps, then additions. With shuffle the same moves come out
+    in random order.
+    """
+    n_remove = len(path) if len(path) > 1 else 0
+    n_swap = max(len(path)-1,0)
+    in_path = set(path)
+    if shuffle:
+        missing = [t for t in tasks if t not in in_path]
+        n_moves = n_remove + n_swap + len(missing)
+        for k in rng.sample(range(n_moves),n_moves):
+            if k < n_remove:
+                yield ('remove',k)
+            elif k < n_remove + n_swap:
+                yield ('swap',k-n_remove)
+            else:
+                yield ('add',missing[k-n_remove-n_swap])
+        return
+
+    #remove task
+    for i in range(n_remove):
+        yield ('remove',i)
+
+    #swap every adjacent pair
+    for i in range(n_swap):
+        yield ('swap',i)
 
     #add tasks not in 
     for t in tasks:
-        if t not in path:
-            new_path = path + [t]
-            neighbors.append(new_path)
+        if t not in in_path:
+            yield ('add',t)
+
+def move_error(problem: Problem, path: list, state: tuple, move: tuple):
+    """
+    Error of the path after applying move, without building it.
+    swap and add are O(1). The first removal scored against a state computes every
+    removal's lateness at once (O(n log n), see removal_penalties), later ones are O(1).
+    """
+    tasks = problem.tasks
+    target = problem.target
+    value, finish, lateness, late, penalty, removals = state
+    kind, arg = move
+    if kind == 'add':
+        v, length, deadline = tasks[arg]
+        end = (finish[-1] if finish else 0) + length
+        return max(target-value-v,0) + penalty + max(end-deadline,0)
 
-    return neighbors
+    if kind == 'swap':
+        a, b = tasks[path[arg]], tasks[path[arg+1]]
+        start = finish[arg] - a[1]
+        penalty -= lateness[arg] + lateness[arg+1]
+        penalty += max(start+b[1]-b[2],0) + max(finish[arg+1]-a[2],0)
+        return max(target-value,0) + penalty
 
-def hill_climbing(tasks: dict):
+    #remove
+    if not removals:
+        removals.extend(removal_penalties(tasks,path,state))
+    return max(target-value+tasks[path[arg]][0],0) + removals[arg]
+
+def move_value(tasks: dict, path: list, state: tuple, move: tuple):
+    #total value of the path after applying move
+    kind, arg = move
+    if kind == 'add':
+        return state[0] + tasks[arg][0]
+    if kind == 'remove':
+        return state[0] - tasks[path[arg]][0]
+    return state[0]
+
+def apply_move(path: list, move: tuple):
+    kind, arg = move
+    if kind == 'remove':
+        return path[:arg] + path[arg+1:]
+    if kind == 'swap':
+        new_path = path[:]
+        new_path[arg],new_path[arg+1] = new_path[arg+1],new_path[arg]
+        return new_path
+    return path + [arg]
+
+def hill_climbing(problem: Problem, strategy: str = "steepest", shuffle: bool = False, rng = rand, stop = None,
+                  vectorised: bool = False, start: list = None):
     """
     To specify a starting path, add a "//" to the first line of the input.txt file and then the path afterwards
     ex. first line: 22 V 4 // D F C B
+    strategy "steepest" scores every neighbour and moves to the best one,
+    "first" moves to the first neighbour that improves on the current error.
+    shuffle visits the neighbours in random order.
+    rng supplies all randomness, stop is polled once per step and abandons the climb when it returns True.
+    vectorised scores each neighbourhood with one TaskTable.move_errors call.
+    start is the path to climb from, a random one is generated if it is empty.
     """
-    global start_path
+    tasks = problem.tasks
+    tracer = problem.tracer
+    trace = tracer.enabled
+    debug = trace and tracer.level >= DEBUG
     path = []
     err = 0
-    if len(start_path) > 0:
-        path, err = start_path, error(tasks,start_path)
-        print(f"Using specified start path: ", end = "")
-        print_path_hc(tasks,start_path)
-        start_path = []
+    if start:
+        path, err = list(start), error(problem,start)
+        tracer.event('restart',"Using specified start path: " + format_path(path,sum_path(tasks,path),err),INFO)
     else:
-        path, _, err = generate_starting_state(tasks)
-        print(f"Randomly chosen start state: ", end = "")
-        print_path_hc(tasks,path)
+        path, value, err = generate_starting_state(problem,rng)
+        tracer.event('restart',"Randomly chosen start state: " + format_path(path,value,err),INFO)
     if err == 0:
         return path, err
+    table = TaskTable(tasks) if vectorised else None
     while True:
-        neighbors = generate_neighbors(tasks,path)
+        if stop is not None and stop():
+            return [],sys.maxsize
+        if table is not None:
+            best_move, e = batch_move(problem,table,path,err,strategy,shuffle,rng)
+            if best_move is None:
+                return [],sys.maxsize
+            path, err = apply_move(path,best_move), e
+            if err == 0:
+                return path, err
+            if trace:
+                tracer.count('move')
+                if debug:
+                    tracer.log("")
+                    tracer.log("Move to " + format_path(path,sum_path(tasks,path),err))
+            continue
+        state = path_state(tasks,path)
         cur_error = err
-        if verbose:
-            print("Neighbors")
-        for nb in neighbors:
-            if verbose:
-                print_path_hc(tasks,nb)
-            e = error(tasks, nb)
+        best_move = None
+        if debug:
+            tracer.log("Neighbors")
+        for move in generate_moves(tasks,path,shuffle,rng):
+            e = move_error(problem,path,state,move)
+            problem.evaluations += 1
+            if debug:
+                tracer.log(format_path(apply_move(path,move),move_value(tasks,path,state,move),e))
             if e == 0:
                 #solution found
-                return nb, e
+                return apply_move(path,move), e
             if e < err:
                 #found better path
-                path = nb
+                best_move = move
                 err = e
+                if strategy == "first":
+                    break
         if err == cur_error:
             #search failed, reached local max with no solution
             return [],sys.maxsize
-        if verbose:
-            print()
-            print("Move to ",end = "")
-            print_path_hc(tasks,path)
+        if trace:
+            tracer.count('move')
+            if debug:
+                tracer.log("")
+                tracer.log("Move to " + format_path(apply_move(path,best_move),move_value(tasks,path,state,best_move),err))
+        path = apply_move(path,best_move)
 
     return path, err
 
-def rr_hill_climbing(tasks: dict,n: int):
-    #n: number of random restarts
+def batch_move(problem: Problem, table: TaskTable, path: list, err: int, strategy: str, shuffle: bool, rng = rand):
+    """
+    The move selection of hill_climbing with the whole neighbourhood scored by one
+    TaskTable.move_errors call. Returns the chosen move and its error, or (None, err) when
+    no neighbour improves on err.
+    """
+    tasks = problem.tasks
+    state = path_state(tasks,path)
+    removals = removal_penalties(tasks,path,state) if len(path) > 1 else []
+    errs, values, moves = table.move_errors(table.encode(path),state,removals,problem.target)
+    if len(moves) == 0:
+        return None, err
+    problem.evaluations += len(moves)
+    order = np.array(rng.sample(range(len(moves)),len(moves))) if shuffle else np.arange(len(moves))
+    tracer = problem.tracer
+    if tracer.enabled and tracer.level >= DEBUG:
+        tracer.log("Neighbors")
+        for k in order:
+            tracer.log(format_path(apply_move(path,moves[k]),int(values[k]),int(errs[k])))
+            #the scalar path stops listing at a solution, or at the first improvement with "first"
+            if errs[k] == 0 or (strategy == "first" and errs[k] < err):
+                break
+    errs = errs[order]
+    if strategy == "first":
+        better = np.flatnonzero(errs < err)
+        if len(better) == 0:
+            return None, err
+        k = better[0]
+    else:
+        k = int(np.argmin(errs))
+        if errs[k] >= err:
+            return None, err
+    return moves[order[k]], int(errs[k])
+
+def restart_seeds(seed, n: int):
+    #independent seeds for n restarts derived from one master seed (None draws fresh entropy)
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(n)]
+
+def rr_hill_climbing(problem: Problem,n: int, strategy: str = "steepest", shuffle: bool = False,
+                     workers: int = 1, seed = None, vectorised: bool = False):
+    #n: number of random restarts, the first one climbs from problem.start_path if there is one
+    #with a seed every restart gets its own random.Random stream, so the result only depends
+    #on the seed and not on how many workers ran the restarts
+    if workers > 1:
+        return parallel_rr_hill_climbing(problem,n,strategy,shuffle,workers,seed,vectorised)
+    tracer = problem.tracer
+    seeds = restart_seeds(seed,n) if seed is not None else None
     best_path = []
     best_error = sys.maxsize
     for i in range(n):
-        path, error = hill_climbing(tasks)
+        rng = rand.Random(seeds[i]) if seeds else rand
+        start = problem.start_path if i == 0 else None
+        path, error = hill_climbing(problem,strategy,shuffle,rng,vectorised = vectorised,start = start)
         if error == 0:
-            if verbose:
-                print()
+            if tracer.level >= DEBUG:
+                tracer.log("")
             return path, error
         if error < best_error:
             best_error = error
             best_path = path
-        if verbose:
+        if tracer.level >= DEBUG:
             if error == sys.maxsize:
-                print("Search failed")
-            print()
+                tracer.log("Search failed")
+            tracer.log("")
+    return best_path, best_error
+
+"""
+Parallel random restarts
+"""
+_worker_problem = None
+_cutoff = None  #shared index of the earliest restart known to have reached error 0
+
+def _init_worker(problem: Problem, cutoff):
+    global _worker_problem, _cutoff
+    _worker_problem = problem
+    #restarts report back through their return value, their log lines would only interleave,
+    #counters are sent back and merged
+    _worker_problem.tracer = Tracer(QUIET) if problem.tracer.enabled else NULL_TRACER
+    _cutoff = cutoff
+
+def _run_restart(index: int, seed: int, strategy: str, shuffle: bool, vectorised: bool):
+    if _cutoff.value < index:
+        return index, [], sys.maxsize, 0, {}
+    #the start path given in input.txt belongs to the first restart, as in the sequential loop
+    start = _worker_problem.start_path if index == 0 else None
+    stop = lambda: _cutoff.value < index
+    _worker_problem.evaluations = 0
+    _worker_problem.tracer.counts = {}
+    path, err = hill_climbing(_worker_problem,strategy,shuffle,rand.Random(seed),stop,vectorised,start)
+    return index, path, err, _worker_problem.evaluations, _worker_problem.tracer.counts
+
+def parallel_rr_hill_climbing(problem: Problem, n: int, strategy: str, shuffle: bool, workers: int, seed = None,
+                              vectorised: bool = False):
+    """
+    Runs the restarts of rr_hill_climbing over a process pool.
+    When restart i reaches error 0 every restart after i is cancelled, restarts before i keep
+    running since one of them may also succeed. The answer is picked the way the sequential loop
+    would pick it (first restart with error 0, otherwise the first with the lowest error), so a
+    given seed gives the same result for any number of workers.
+    """
+    seeds = restart_seeds(seed,n)
+    cutoff = mp.Value('i',n)
+    results = {}
+    with ProcessPoolExecutor(max_workers = workers,initializer = _init_worker,
+                             initargs = (problem,cutoff)) as pool:
+        futures = [pool.submit(_run_restart,i,seeds[i],strategy,shuffle,vectorised) for i in range(n)]
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            i, path, err, evaluations, counts = future.result()
+            results[i] = (path,err)
+            problem.evaluations += evaluations
+            for kind,n_events in counts.items():
+                problem.tracer.count(kind,n_events)
+            if err == 0 and i < cutoff.value:
+                with cutoff.get_lock():
+                    cutoff.value = min(cutoff.value,i)
+                for f in futures[i+1:]:
+                    f.cancel()
+
+    best_path = []
+    best_error = sys.maxsize
+    for i in sorted(results):
+        path, error = results[i]
+        if error == 0:
+            return path, error
+        if error < best_error:
+            best_error = error
+            best_path = path
     return best_path, best_error
 
 def main():
-    global num_random_restarts
-    global start_path
-    tasks = parse_input_file()
-    hc_path, _ = rr_hill_climbing(tasks,num_random_restarts)
+    parser = argparse.ArgumentParser(description = "Hill climbing over the tasks in input.txt")
+    parser.add_argument('--strategy',choices = ["steepest","first"],default = "steepest",
+                        help = "move to the best neighbour or the first improving one")
+    parser.add_argument('--shuffle',action = 'store_true',help = "visit neighbours in random order")
+    parser.add_argument('--workers',type = int,default = 1,help = "run the random restarts over this many processes")
+    parser.add_argument('--seed',type = int,default = None,help = "master seed for reproducible restarts")
+    parser.add_argument('--vectorised',action = 'store_true',help = "score each neighbourhood with one NumPy call")
+    args = parser.parse_args()
+    problem = parse_input_file()
+    if problem.restarts < 0:
+        print("Incorrect input, please specify number of random restarts")
+        sys.exit(0)
+    hc_path, _ = rr_hill_climbing(problem,problem.restarts,args.strategy,args.shuffle,args.workers,args.seed,
+                                 args.vectorised)
+    problem.tracer.flush()
 
     if len(hc_path) == 0:
         print("No solution found")
     else:
         print("Found solution ",end="")
-        print_path(tasks,hc_path)
+        print_path(problem.tasks,hc_path)
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
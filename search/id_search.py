@@ -3,108 +3,119 @@ Author: Kaikai Du
 Artificial Intelligence Programming Assignment 1
 Iterative deepening
 """
-import re 
+from collections import OrderedDict
 
-verbose = False
-target = 0
+from scheduling import Problem, parse_input_file, parse_path, can_schedule, print_path, format_path
+from tracing import DEBUG
 
-"""
-Utility functions
-"""
-def parse_input_file():
-    global verbose
-    global target
-    try:
-        table = {}
-        target = 0
-        with open('input.txt','r',encoding = 'utf-8') as file:
-            first_line = file.readline().strip().split(" ")
-            target = int(first_line[0])
-            verbose = True if first_line[1] == 'V' else False
-
-            for line in file:
-                line = re.sub(r'\s\s+', ' ',line.strip()).split(' ')
-                table[line[0]] = (int(line[1]),int(line[2]),int(line[3]))
-
-    except Exception as e:
-        print(f"encountered exception {e} while parsing input file")
-    
-    return table
-
-def sum_path(tasks: dict, path: list):
-    total = 0
-    for t in path:
-        total += tasks[t][0]
-    return total
-
-def sum_timestamp(tasks: dict, path: list):
-    total = 0
-    for t in path:
-        total += tasks[t][1]
-    return total
-
-def parse_path(tasks: dict, path: list):
-    total_value = sum_path(tasks,path)
-    timestamp = sum_timestamp(tasks,path)
-    return total_value, timestamp
+class TranspositionTable:
+    """
+    Remembers subtrees that did not reach target, keyed on (set of used tasks, elapsed time).
+    Every ordering of the same tasks ends at the same time with the same value and the same
+    tasks left to add, so their subtrees are identical. An entry stores how many levels
+    below it were searched and the best value seen there; it cuts the node again whenever
+    at most that many levels are left. Subtrees that never hit the depth limit are stored
+    with unlimited depth so they are cut at every later depth as well.
+    Holds at most capacity entries, evicting the least recently used.
+    """
+    def __init__(self,capacity = 100000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.depth_cutoffs = 0  #number of times dfs stopped at the depth limit
+        self.hits = 0
 
-def print_path_id(tasks:dict,path: list):
-    print(*(t for t in path), end = " ")
-    print(f"Value = {sum_path(tasks,path)}")
+    def lookup(self,key,remaining):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < remaining:
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        if entry[0] != float('inf'):
+            #the subtree being skipped did hit the depth limit
+            self.depth_cutoffs += 1
+        return entry[1]
 
-def can_schedule(tasks: dict, path: list):
-    cur_time = 0
-    for t in path:
-        cur_time += tasks[t][1]
-        if cur_time > tasks[t][2]:
-            return False
-    return True
+    def store(self,key,remaining,value):
+        self.entries[key] = (remaining,value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last = False)
 
 """
 Iterative deepening search functions
 """
-def dfs(tasks: dict, k: int, n: int, path: list):
-    if verbose:
-        print_path_id(tasks,path)
+def dfs(problem: Problem, k: int, n: int, path: list, table = None, debug: bool = False):
+    #debug is resolved from the tracer once by iterative_deepening, nodes are counted in problem.evaluations
+    tasks = problem.tasks
+    target = problem.target
+    problem.evaluations += 1
+    total_value, cur_time = parse_path(tasks,path)
+    if debug:
+        problem.tracer.log(format_path(path,total_value))
     if n == k:
         #if we have reached target depth then we stop recursion
-        return path, sum_path(tasks,path)
+        if table is not None:
+            table.depth_cutoffs += 1
+        return path, total_value
 
-    total_value, cur_time = parse_path(tasks,path)
     if total_value >= target:
         return path, total_value
 
+    if table is not None:
+        key = (frozenset(path),cur_time)
+        best = table.lookup(key,k-n)
+        if best is not None:
+            return [],best
+        cutoffs = table.depth_cutoffs
+
+    best = total_value
     for t,t_info in tasks.items():
         if t not in path:
             new_path = path + [t]
             if can_schedule(tasks,new_path):
-                child_path,value= dfs(tasks,k,n+1,new_path)
+                child_path,value= dfs(problem,k,n+1,new_path,table,debug)
                 if value >= target:
                     return child_path,value
-            
-    return [],-1
+                best = max(best,value)
 
-def iterative_deepening(tasks: dict):
-    for max_depth in range(0,len(tasks)):
-        if verbose:
-            print(f"Depth = {max_depth+1}")
-        for t in tasks:
-            path, value = dfs(tasks,max_depth,0,[t])
-            if value >= target:
-                return path
-        if verbose:
-            print()
-    
-    return []
+    if table is not None:
+        remaining = k-n if table.depth_cutoffs > cutoffs else float('inf')
+        table.store(key,remaining,best)
+    return [],best
+
+def iterative_deepening(problem: Problem, table_size: int = 100000):
+    #table_size: entries kept in the transposition table, 0 disables it
+    table = TranspositionTable(table_size) if table_size > 0 else None
+    tracer = problem.tracer
+    debug = tracer.enabled and tracer.level >= DEBUG
+    start_evaluations = problem.evaluations
+    path = []
+    for max_depth in range(0,len(problem.tasks)):
+        tracer.event('depth',f"Depth = {max_depth+1}")
+        for t in problem.tasks:
+            found, value = dfs(problem,max_depth,0,[t],table,debug)
+            if value >= problem.target:
+                path = found
+                break
+        if path:
+            break
+        if debug:
+            tracer.log("")
+
+    if tracer.enabled:
+        tracer.count('node',problem.evaluations-start_evaluations)
+    return path
 
 
 def main():
-    tasks = parse_input_file()
-    id_return_path = iterative_deepening(tasks)
+    problem = parse_input_file()
+    id_return_path = iterative_deepening(problem)
+    problem.tracer.flush()
     if id_return_path == []:
         print("No solution found")
     else:
         print("Found solution: ",end = "")
-        print_path_id(tasks,id_return_path)
+        print_path(problem.tasks,id_return_path)
     
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Author: Kaikai Du
+Simulated annealing and tabu search over the same task table, error function and
+moves (remove, adjacent swap, add) as hc_search.py, except that add inserts the task by deadline
+Usage: python3 local_search.py --engine anneal|tabu [options], reads input.txt like hc_search.py
+"""
+import argparse
+import math
+import sys
+import time
+import random as rand
+
+from scheduling import Problem, parse_input_file, print_path, format_path
+from hc_search import path_state, generate_moves, move_error, apply_move, generate_starting_state
+from tracing import DEBUG
+
+"""
+Utility functions
+"""
+def path_error(problem: Problem, state: tuple):
+    value, penalty = state[0], state[4]
+    return max(problem.target-value,0) + penalty
+
+def random_move(path: list, missing: list, rng):
+    #uniform over the moves generate_moves would list for path
+    n_remove = len(path) if len(path) > 1 else 0
+    n_swap = max(len(path)-1,0)
+    n_moves = n_remove + n_swap + len(missing)
+    if n_moves == 0:
+        return None
+    k = rng.randrange(n_moves)
+    if k < n_remove:
+        return ('remove',k)
+    if k < n_remove + n_swap:
+        return ('swap',k-n_remove)
+    return ('add',missing[k-n_remove-n_swap])
+
+def insert_position(tasks: dict, path: list, t: str):
+    #index of the first task in path due after t
+    deadline = tasks[t][2]
+    for i,u in enumerate(path):
+        if tasks[u][2] > deadline:
+            return i
+    return len(path)
+
+def local_move_error(problem: Problem, path: list, state: tuple, move: tuple):
+    """
+    move_error, except that add puts the task in front of the first task due after it
+    instead of at the end. Appended, a task with an early deadline is late by nearly the whole
+    path, so once removed it was almost never added back. The insert is O(n).
+    """
+    if move[0] != 'add':
+        return move_error(problem,path,state,move)
+    tasks = problem.tasks
+    value, finish, lateness, _, _, _ = state
+    v, length, deadline = tasks[move[1]]
+    i = insert_position(tasks,path,move[1])
+    end = (finish[i-1] if i > 0 else 0) + length
+    penalty = sum(lateness[:i]) + max(end-deadline,0)
+    for j in range(i,len(path)):
+        penalty += max(finish[j]+length-tasks[path[j]][2],0)
+    return max(problem.target-value-v,0) + penalty
+
+def apply_local_move(tasks: dict, path: list, move: tuple):
+    if move[0] != 'add':
+        return apply_move(path,move)
+    i = insert_position(tasks,path,move[1])
+    return path[:i] + [move[1]] + path[i:]
+
+def missing_tasks(tasks: dict, path: list):
+    in_path = set(path)
+    return [t for t in tasks if t not in in_path]
+
+def initial_path(problem: Problem, rng):
+    #the start path from input.txt if there is one, otherwise a random one like hill_climbing
+    if len(problem.start_path) > 0:
+        return list(problem.start_path)
+    path, _, _ = generate_starting_state(problem,rng)
+    return path
+
+"""
+Simulated annealing
+"""
+def initial_temperature(problem: Problem, path: list, state: tuple, err: int, accept: float, samples: int, rng):
+    #temperature at which the mean uphill delta of samples random moves from path is accepted
+    #with probability accept, and the number of moves scored for it
+    missing = missing_tasks(problem.tasks,path)
+    uphill = []
+    for k in range(samples):
+        move = random_move(path,missing,rng)
+        if move is None:
+            return 1.0, k
+        delta = local_move_error(problem,path,state,move) - err
+        if delta > 0:
+            uphill.append(delta)
+    if not uphill:
+        return 1.0, samples
+    return -(sum(uphill)/len(uphill))/math.log(accept), samples
+
+def temperature(schedule: str, t0: float, t_end: float, progress: float):
+    #progress is the used fraction of the current cycle's share of the budget
+    if schedule == "linear":
+        return t0 + (t_end-t0)*progress
+    return t0*(t_end/t0)**progress
+
+def simulated_annealing(problem: Problem, t0: float = None, t_end: float = 0.05, schedule: str = "geometric",
+                        cycles: int = 10, accept: float = 0.3, max_evals: int = 100000, time_budget: float = None,
+                        rng = rand):
+    """
+    Proposes one random move at a time and accepts it if it does not increase the error,
+    or with probability exp(-delta/T) otherwise. The budget (max_evals move evaluations, or
+    time_budget seconds if that runs out first) is split into cycles equal shares. Each cycle
+    reheats to t0 from the best path seen and cools to t_end by the end of its share,
+    geometrically or linearly. t0 defaults to the temperature at which the mean uphill move
+    from the start path is accepted with probability accept (100 sampled moves).
+    Stops at error 0 or when the budget is used up. Returns the best path seen and its error.
+    """
+    tasks = problem.tasks
+    tracer = problem.tracer
+    trace = tracer.enabled
+    debug = trace and tracer.level >= DEBUG
+    start = time.perf_counter()
+    path = initial_path(problem,rng)
+    state = path_state(tasks,path)
+    err = path_error(problem,state)
+    missing = missing_tasks(tasks,path)
+    best_path, best_err = path, err
+    evals = 0
+    if t0 is None:
+        t0, evals = initial_temperature(problem,path,state,err,accept,100,rng)
+    t0 = max(t0,t_end)
+    cycle = 0
+    while best_err > 0 and evals < max_evals:
+        progress = evals/max_evals
+        if time_budget is not None:
+            progress = max(progress,(time.perf_counter()-start)/time_budget)
+            if progress >= 1:
+                break
+        if int(progress*cycles) > cycle:
+            cycle = int(progress*cycles)
+            path = best_path
+            state = path_state(tasks,path)
+            err = best_err
+            missing = missing_tasks(tasks,path)
+            if trace:
+                tracer.count('reheat')
+        temp = temperature(schedule,t0,t_end,progress*cycles-cycle)
+        move = random_move(path,missing,rng)
+        if move is None:
+            break
+        e = local_move_error(problem,path,state,move)
+        evals += 1
+        delta = e - err
+        if delta <= 0 or rng.random() < math.exp(-delta/temp):
+            path = apply_local_move(tasks,path,move)
+            state = path_state(tasks,path)
+            err = e
+            if move[0] != 'swap':
+                missing = missing_tasks(tasks,path)
+            if trace:
+                tracer.count('move')
+                if debug:
+                    tracer.log(f"T = {temp:.3f} Move to " + format_path(path,state[0],err))
+            if err < best_err:
+                best_path, best_err = path, err
+    problem.evaluations += evals
+    return best_path, best_err
+
+"""
+Tabu search
+"""
+def move_key(path: list, move: tuple):
+    #moves are made tabu by the tasks they touch, not by position
+    kind, arg = move
+    if kind == 'remove':
+        return ('remove',path[arg])
+    if kind == 'swap':
+        return ('swap',) + tuple(sorted((path[arg],path[arg+1])))
+    return ('add',arg)
+
+def inverse_key(key: tuple):
+    if key[0] == 'remove':
+        return ('add',key[1])
+    if key[0] == 'add':
+        return ('remove',key[1])
+    return key
+
+def tabu_search(problem: Problem, tenure: int = 10, max_evals: int = 100000, time_budget: float = None,
+                rng = rand):
+    """
+    Moves to the best non-tabu neighbour every iteration, even if it is worse than the
+    current path, so the search walks out of the local minima hill_climbing stops in.
+    Undoing a move is tabu for tenure iterations unless it would beat the best error seen.
+    A swap that leaves the error unchanged is only taken if it puts the pair in deadline order,
+    so the search sorts on-time tasks, which makes room for later adds, instead of wandering.
+    Stops at error 0, after max_evals move evaluations or after time_budget seconds.
+    Returns the best path seen and its error.
+    """
+    tasks = problem.tasks
+    tracer = problem.tracer
+    trace = tracer.enabled
+    debug = trace and tracer.level >= DEBUG
+    start = time.perf_counter()
+    path = initial_path(problem,rng)
+    state = path_state(tasks,path)
+    best_path, best_err = path, path_error(problem,state)
+    tabu = {} #move key -> first iteration it is allowed again
+    evals = 0
+    iteration = 0
+    while best_err > 0 and evals < max_evals:
+        if time_budget is not None and time.perf_counter()-start > time_budget:
+            break
+        err = path_error(problem,state)
+        chosen = None
+        chosen_err = sys.maxsize
+        fallback = None  #best tabu move, taken when every move is tabu
+        fallback_err = sys.maxsize
+        for move in generate_moves(tasks,path):
+            e = local_move_error(problem,path,state,move)
+            evals += 1
+            if move[0] == 'swap' and e == err and tasks[path[move[1]]][2] <= tasks[path[move[1]+1]][2]:
+                continue
+            if e < chosen_err and (tabu.get(move_key(path,move),0) <= iteration or e < best_err):
+                chosen, chosen_err = move, e
+            elif e < fallback_err:
+                fallback, fallback_err = move, e
+        if chosen is None:
+            chosen, chosen_err = fallback, fallback_err
+        if chosen is None:
+            break
+        tabu[inverse_key(move_key(path,chosen))] = iteration + tenure + 1
+        path = apply_local_move(tasks,path,chosen)
+        state = path_state(tasks,path)
+        iteration += 1
+        if trace:
+            tracer.count('move')
+            if debug:
+                tracer.log(f"Iteration {iteration} Move to " + format_path(path,state[0],chosen_err))
+        if chosen_err < best_err:
+            best_path, best_err = path, chosen_err
+    problem.evaluations += evals
+    return best_path, best_err
+
+def main():
+    parser = argparse.ArgumentParser(description = "Simulated annealing / tabu search over the tasks in input.txt")
+    parser.add_argument('--engine',choices = ["anneal","tabu"],default = "anneal")
+    parser.add_argument('--evals',type = int,default = 100000,help = "maximum number of move evaluations")
+    parser.add_argument('--time',type = float,default = None,help = "time budget in seconds")
+    parser.add_argument('--seed',type = int,default = None)
+    parser.add_argument('--t0',type = float,default = None,help = "annealing: starting temperature, sampled by default")
+    parser.add_argument('--t-end',type = float,default = 0.05,help = "annealing: temperature at the end of each cycle")
+    parser.add_argument('--schedule',choices = ["geometric","linear"],default = "geometric")
+    parser.add_argument('--cycles',type = int,default = 10,help = "annealing: reheats from the best path, one per share of the budget")
+    parser.add_argument('--accept',type = float,default = 0.3,help = "annealing: acceptance of the mean uphill move at the sampled t0")
+    parser.add_argument('--tenure',type = int,default = 10,help = "tabu: iterations a reversed move stays tabu")
+    args = parser.parse_args()
+
+    problem = parse_input_file()
+    rng = rand.Random(args.seed)
+    if args.engine == "anneal":
+        path, err = simulated_annealing(problem,args.t0,args.t_end,args.schedule,args.cycles,args.accept,
+                                        args.evals,args.time,rng)
+    else:
+        path, err = tabu_search(problem,args.tenure,args.evals,args.time,rng)
+    problem.tracer.flush()
+
+    if err != 0:
+        print("No solution found")
+    else:
+        print("Found solution ",end="")
+        print_path(problem.tasks,path)
+    print(f"Evaluations = {problem.evaluations}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Author: Kaikai Du
+Shared scheduling core for the search programs: the input.txt parser, the problem
+object and the path utilities every search engine uses
+"""
+import re
+
+from tracing import Tracer, NULL_TRACER, INFO, DEBUG
+
+class Problem:
+    """
+    One scheduling problem: pick and order tasks so their total value reaches target
+    while every task finishes by its deadline.
+    tasks maps name -> (value, length, deadline). restarts and start_path are only
+    used by hill climbing. evaluations counts the paths/moves/nodes an engine scored,
+    tracer receives the engine's events (see tracing.py), by default nothing is recorded.
+    """
+    def __init__(self, tasks: dict, target: int, restarts: int = -1, start_path: list = None, tracer: Tracer = NULL_TRACER):
+        self.tasks = tasks
+        self.target = target
+        self.restarts = restarts
+        self.start_path = start_path if start_path is not None else []
+        self.evaluations = 0
+        self.tracer = tracer
+
+"""
+Utility functions
+"""
+def parse_input_file(filename: str = 'input.txt'):
+    """
+    First line: target V|C [random restarts] [// start path]
+    then one task per line: name value length deadline
+    """
+    table = {}
+    target = 0
+    verbose = False
+    restarts = -1
+    start_path = []
+    try:
+        with open(filename,'r',encoding = 'utf-8') as file:
+            first_line = file.readline().strip().split(" ")
+            target = int(first_line[0])
+            verbose = True if first_line[1] == 'V' else False
+            if len(first_line) >= 3 and first_line[2].isnumeric():
+                restarts = int(first_line[2])
+
+            if len(first_line) > 4 and first_line[3] == "//":
+                #has specified starting matrix
+                start_path = [t for t in first_line[4:]]
+
+            for line in file:
+                if not line.strip():
+                    continue
+                line = re.sub(r'\s\s+', ' ',line.strip()).split(' ')
+                table[line[0]] = (int(line[1]),int(line[2]),int(line[3]))
+
+    except Exception as e:
+        print(f"encountered exception {e} while parsing input file")
+
+    #the V flag logs every node, otherwise only the start/result lines the programs always printed
+    tracer = Tracer(DEBUG if verbose else INFO)
+    return Problem(table,target,restarts,start_path,tracer)
+
+def sum_path(tasks: dict, path: list):
+    total = 0
+    for t in path:
+        total += tasks[t][0]
+    return total
+
+def sum_timestamp(tasks: dict, path: list):
+    total = 0
+    for t in path:
+        total += tasks[t][1]
+    return total
+
+def parse_path(tasks: dict, path: list):
+    total_value = sum_path(tasks,path)
+    timestamp = sum_timestamp(tasks,path)
+    return total_value, timestamp
+
+def can_schedule(tasks: dict, path: list):
+    cur_time = 0
+    for t in path:
+        cur_time += tasks[t][1]
+        if cur_time > tasks[t][2]:
+            return False
+    return True
+
+#error function for the local searches: missing value plus total lateness, 0 iff path solves problem
+def error(problem: Problem, path: list):
+    tasks = problem.tasks
+    e = max(problem.target-sum_path(tasks,path),0)
+    cur_time = 0
+    for t in path:
+        length = tasks[t][1]
+        deadline = tasks[t][2]
+        cur_time += length
+        if cur_time > deadline:
+            e += cur_time - deadline
+    return e
+
+def is_solution(problem: Problem, path: list):
+    return can_schedule(problem.tasks,path) and sum_path(problem.tasks,path) >= problem.target
+
+def format_path(path: list, value: int, err: int = None):
+    #the line print_path prints, for when value (and error) are already known
+    line = f"{' '.join(path)} Value = {value}"
+    return line if err is None else f"{line} Error = {err}"
+
+def print_path(tasks:dict,path: list):
+    print(*(t for t in path), end = " ")
+    print(f"Value = {sum_path(tasks,path)}")
+
+def deadline_order(tasks: dict):
+    return sorted(tasks, key = lambda t: tasks[t][2])
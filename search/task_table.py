@@ -0,0 +1,102 @@
+"""
+Author: Kaikai Du
+Array-backed task table: task names interned to integer ids, value/length/deadline held in
+NumPy arrays, whole batches of paths scored at once and every move from a path scored by delta
+"""
+import numpy as np
+
+class TaskTable:
+    def __init__(self,tasks: dict):
+        #tasks: name -> (value, length, deadline) as read from input.txt
+        self.names = list(tasks)
+        self.ids = {t:i for i,t in enumerate(self.names)}
+        n = len(self.names)
+        #id n pads shorter paths in a batch: no value, no length and it is never late
+        self.pad = n
+        self.value = np.array([tasks[t][0] for t in self.names] + [0],dtype = np.int64)
+        self.length = np.array([tasks[t][1] for t in self.names] + [0],dtype = np.int64)
+        self.deadline = np.array([tasks[t][2] for t in self.names] + [np.iinfo(np.int64).max],dtype = np.int64)
+
+    def encode(self,path: list):
+        return np.array([self.ids[t] for t in path],dtype = np.int64)
+
+    def decode(self,path_ids):
+        return [self.names[i] for i in path_ids if i != self.pad]
+
+    def batch(self,paths: list):
+        #list of name paths -> (len(paths), longest) id matrix padded with self.pad
+        width = max((len(p) for p in paths),default = 0)
+        mat = np.full((len(paths),width),self.pad,dtype = np.int64)
+        for r,p in enumerate(paths):
+            mat[r,:len(p)] = self.encode(p)
+        return mat
+
+    def evaluate(self,mat):
+        """
+        Scores every row of an id matrix at once.
+        Returns the value of each path, its finish time and how late each position is.
+        """
+        values = self.value[mat].sum(axis = 1)
+        finish = np.cumsum(self.length[mat],axis = 1)
+        lateness = np.maximum(finish - self.deadline[mat],0)
+        end = finish[:,-1] if mat.shape[1] else np.zeros(len(mat),dtype = np.int64)
+        return values, end, lateness
+
+    def errors(self,mat,target: int):
+        #hc_search's error function for every row
+        values, _, lateness = self.evaluate(mat)
+        return np.maximum(target-values,0) + lateness.sum(axis = 1)
+
+    def feasible(self,mat):
+        #can_schedule for every row
+        _, _, lateness = self.evaluate(mat)
+        return ~(lateness > 0).any(axis = 1)
+
+    def move_errors(self,path_ids,state: tuple,removals,target: int):
+        """
+        Error and value of every neighbour of a path, in the order hc_search.generate_moves
+        lists the moves: removals, adjacent swaps, additions. The delta formulas of
+        hc_search.move_error are applied to whole arrays of path_state's finish/lateness,
+        removals is the lateness after each removal (hc_search.removal_penalties).
+        Returns the errors, the values and the matching moves.
+        """
+        m = len(path_ids)
+        value, finish, lateness, _, penalty, _ = state
+        finish = np.array(finish,dtype = np.int64)
+        lateness = np.array(lateness,dtype = np.int64)
+        lengths = self.length[path_ids]
+        deadlines = self.deadline[path_ids]
+        errs = []
+        values = []
+        moves = []
+
+        if m > 1:
+            #remove task i
+            v = value - self.value[path_ids]
+            errs.append(np.maximum(target-v,0) + np.asarray(removals,dtype = np.int64))
+            values.append(v)
+            moves += [('remove',i) for i in range(m)]
+
+            #swap i and i+1: i+1 starts where i started, i finishes where i+1 finished
+            a, b = slice(0,m-1), slice(1,m)
+            start = finish[a] - lengths[a]
+            swapped = penalty - lateness[a] - lateness[b]
+            swapped += np.maximum(start+lengths[b]-deadlines[b],0) + np.maximum(finish[b]-deadlines[a],0)
+            errs.append(max(target-value,0) + swapped)
+            values.append(np.full(m-1,value,dtype = np.int64))
+            moves += [('swap',i) for i in range(m-1)]
+
+        #add tasks not in the path at the end
+        in_path = np.zeros(self.pad,dtype = bool)
+        in_path[path_ids] = True
+        missing = np.flatnonzero(~in_path)
+        if len(missing):
+            end = finish[-1] if m else 0
+            v = value + self.value[missing]
+            errs.append(np.maximum(target-v,0) + penalty + np.maximum(end+self.length[missing]-self.deadline[missing],0))
+            values.append(v)
+            moves += [('add',self.names[i]) for i in missing]
+
+        if not moves:
+            return np.empty(0,dtype = np.int64), np.empty(0,dtype = np.int64), moves
+        return np.concatenate(errs), np.concatenate(values), moves
@@ -0,0 +1,64 @@
+"""
+Author: Kaikai Du
+Tracing for the search engines: counts of search events (nodes expanded, moves accepted,
+restarts, ...) and an optional buffered log that replaces the per-node prints
+"""
+import sys
+
+#log levels
+QUIET = 0   #counters only
+INFO = 1    #start states, results of restarts
+DEBUG = 2   #every node / neighbour, what the V flag in input.txt turns on
+
+class Tracer:
+    """
+    Engines read enabled and level once into locals before their loops and only build
+    a log line when the level asks for it, so a disabled tracer costs one local test.
+    Log lines are buffered and written buffer_lines at a time, flush before printing
+    anything else to the same stream.
+    """
+    enabled = True
+
+    def __init__(self,level: int = QUIET,out = None,buffer_lines: int = 4096):
+        self.level = level
+        self.out = out
+        self.buffer_lines = buffer_lines
+        self.counts = {}
+        self.lines = []
+
+    def count(self,kind: str,n: int = 1):
+        self.counts[kind] = self.counts.get(kind,0) + n
+
+    def log(self,line: str):
+        self.lines.append(line)
+        if len(self.lines) >= self.buffer_lines:
+            self.flush()
+
+    def event(self,kind: str,line: str = None,level: int = DEBUG):
+        self.count(kind)
+        if line is not None and self.level >= level:
+            self.log(line)
+
+    def flush(self):
+        if self.lines:
+            out = self.out if self.out is not None else sys.stdout
+            out.write("\n".join(self.lines) + "\n")
+            self.lines = []
+
+class NullTracer(Tracer):
+    #the default for problems built in code: no counters, no output
+    enabled = False
+
+    def __init__(self):
+        super().__init__(QUIET)
+
+    def count(self,kind: str,n: int = 1):
+        pass
+
+    def log(self,line: str):
+        pass
+
+    def event(self,kind: str,line: str = None,level: int = DEBUG):
+        pass
+
+NULL_TRACER = NullTracer()